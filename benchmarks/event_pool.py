@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+''' Times firing an axel Event, synchronous and asynchronous, and counts
+the threads that get started for it.
+
+    python benchmarks/event_pool.py
+    python benchmarks/event_pool.py --before 7bbdeab^ --after 7bbdeab
+'''
+
+from helpers import getOptions, report, run, timeit
+import threading
+
+started = [0]
+
+
+def countThreads():
+    ''' Count every thread that gets started '''
+
+    start = threading.Thread.start
+    def counted(self):
+        started[0] += 1
+        return start(self)
+    threading.Thread.start = counted
+
+def createEvent(amount):
+    import couchpotato.core.event # Imports axel the way the app does
+    from axl import axel
+
+    # Share one pool, like couchpotato.core.event does
+    if hasattr(axel, 'WorkerPool'):
+        e = axel.Event(pool = axel.WorkerPool(threads = 20), threads = 20, exc_info = True, traceback = True)
+    else:
+        e = axel.Event(threads = 20, exc_info = True, traceback = True)
+
+    for i in range(amount):
+        e.handle(lambda x, i = i: x + i, priority = i)
+
+    return e
+
+def fireAsync(e):
+    done = threading.Semaphore(0)
+    e.handle(lambda x: done.release(), priority = 100)
+
+    if hasattr(e, 'dispatch'):
+        fire = lambda: e.dispatch(True, 1)
+    else:
+        def fire():
+            e.asynchronous = True
+            e.fire(1)
+
+    return fire, lambda: done.acquire()
+
+def measure(root):
+    options = measure.options
+    countThreads()
+
+    for amount in [1, 2, 5]:
+        e = createEvent(amount)
+        started[0] = 0
+        took = timeit(lambda: e.fire(1), options.fires)
+        report('sync, %s handler(s)' % amount, took, options.fires, 'threads started: %s' % started[0])
+
+    for amount in [1, 5]:
+        e = createEvent(amount - 1)
+        fire, wait = fireAsync(e)
+        started[0] = 0
+        def fireAndWait():
+            fire()
+            wait()
+        took = timeit(fireAndWait, options.fires)
+        report('async, %s handler(s)' % amount, took, options.fires, 'threads started: %s' % started[0])
+
+if __name__ == '__main__':
+    measure.options = getOptions('%prog [--before REV [--after REV]] [--fires N]', [
+        (['--fires'], {'dest': 'fires', 'type': 'int', 'default': 5000, 'help': 'Fires per measurement'}),
+    ])
+    run(__file__, measure.options, measure)
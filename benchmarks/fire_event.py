@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+''' Times fireEvent with a single handler and with several handlers, for
+plain functions and for plugin methods.
+
+    python benchmarks/fire_event.py
+    python benchmarks/fire_event.py --before 49b7bce^ --after 49b7bce
+'''
+
+from helpers import getOptions, report, run, timeit
+
+
+class Dummy(object):
+    ''' Tracks its running handlers, like a Plugin '''
+
+    running = []
+
+    def beforeCall(self, handler):
+        self.running.append(handler)
+
+    def afterCall(self, handler):
+        self.running.remove(handler)
+
+    def getName(self):
+        return 'Dummy'
+
+    def handler(self, x):
+        return x
+
+def function(x):
+    return x
+
+def measure(root):
+    from couchpotato.core.event import addEvent, fireEvent
+    options = measure.options
+
+    addEvent('bench.function', function)
+    addEvent('bench.method', Dummy().handler)
+
+    for i in range(options.handlers):
+        addEvent('bench.functions', lambda x, i = i: x + i, priority = i)
+        addEvent('bench.methods', Dummy().handler, priority = i)
+
+    report('plain function call', timeit(lambda: function(1), options.fires), options.fires)
+    for name in ['function', 'method']:
+        took = timeit(lambda: fireEvent('bench.%s' % name, 1, single = True), options.fires)
+        report('1 handler, %s' % name, took, options.fires)
+
+    for name in ['functions', 'methods']:
+        took = timeit(lambda: fireEvent('bench.%s' % name, 1), options.fires)
+        report('%s handlers, %s' % (options.handlers, name), took, options.fires)
+
+        took = timeit(lambda: fireEvent('bench.%s' % name, 1, single = True), options.fires)
+        report('%s handlers, %s, single' % (options.handlers, name), took, options.fires)
+
+if __name__ == '__main__':
+    measure.options = getOptions('%prog [--before REV [--after REV]] [--fires N] [--handlers N]', [
+        (['--fires'], {'dest': 'fires', 'type': 'int', 'default': 5000, 'help': 'Fires per measurement'}),
+        (['--handlers'], {'dest': 'handlers', 'type': 'int', 'default': 5, 'help': 'Handlers of the multi handler events'}),
+    ])
+    run(__file__, measure.options, measure)
@@ -0,0 +1,99 @@
+''' Shared by the benchmark scripts. A script times the current tree, or,
+with --before REV, the tree of that git revision too, so the numbers of
+a change can be compared on the same machine. --after REV times that
+revision instead of the working tree. '''
+
+from optparse import OptionParser
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def getOptions(usage, options = []):
+
+    parser = OptionParser(usage = usage)
+    parser.add_option('--before', dest = 'before', help = 'Git revision to compare the current tree with')
+    parser.add_option('--after', dest = 'after', help = 'Git revision to time instead of the working tree')
+    parser.add_option('--root', dest = 'root', help = 'Tree to time, used internally')
+    for args, kwargs in options:
+        parser.add_option(*args, **kwargs)
+
+    return parser.parse_args()[0]
+
+def run(script, options, measure):
+    ''' Calls measure(root) for the tree in options.root, or runs script
+    for the current tree and the --before revision '''
+
+    if options.root or not options.before:
+        root = options.root or base_path
+        setPath(root)
+        measure(root)
+
+        # Don't wait for the daemon threads of the pools to die
+        sys.stdout.flush()
+        os._exit(0)
+
+    exports = []
+    try:
+        trees = [('before (%s)' % options.before, export(options.before, exports))]
+        if options.after:
+            trees.append(('after (%s)' % options.after, export(options.after, exports)))
+        else:
+            trees.append(('after (working tree)', base_path))
+
+        args = withoutOption(withoutOption(sys.argv[1:], '--before'), '--after')
+        for label, root in trees:
+            print label
+            sys.stdout.flush()
+            subprocess.check_call([sys.executable, script, '--root', root] + args)
+            print
+    finally:
+        for folder in exports:
+            shutil.rmtree(folder)
+
+def export(revision, exports):
+    ''' Extract the code of revision into a temporary folder '''
+
+    folder = tempfile.mkdtemp()
+    exports.append(folder)
+
+    archive = subprocess.Popen(['git', 'archive', revision, 'couchpotato', 'libs'], cwd = base_path, stdout = subprocess.PIPE)
+    subprocess.check_call(['tar', '-x', '-C', folder], stdin = archive.stdout)
+    if archive.wait() != 0:
+        raise SystemExit('Failed exporting revision %s' % revision)
+
+    return folder
+
+def withoutOption(args, option):
+    left = []
+    skip = False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg == option:
+            skip = True
+        elif not arg.startswith(option + '='):
+            left.append(arg)
+
+    return left
+
+def setPath(root):
+    sys.path.insert(0, root)
+    sys.path.insert(0, os.path.join(root, 'libs'))
+
+def timeit(func, amount):
+    ''' Seconds it takes to call func amount times '''
+
+    start = time.time()
+    for i in xrange(amount):
+        func()
+
+    return time.time() - start
+
+def report(name, took, amount, extra = ''):
+    print '  %-32s %8.0f/s %8.2fus each %s' % (name, amount / took, took / amount * 1000000, extra)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+''' Times grouping the leftover files of a synthetic library onto their
+movie files, with the IdentifierIndex and with the linear scan it
+replaced, and checks both find the same groups.
+
+    python benchmarks/scanner_grouping.py
+    python benchmarks/scanner_grouping.py --movies 1000 --skip-linear
+'''
+
+from helpers import getOptions, run
+import os
+import random
+import time
+
+words = ['iron', 'man', 'dark', 'knight', 'star', 'wars', 'the', 'return', 'of', 'king', 'lost', 'city',
+         'blue', 'river', 'night', 'day', 'last', 'first', 'world', 'war', 'red', 'planet', 'house', 'ghost']
+extras = ['%s.nfo', '%s.srt', '%s.en.srt', '%s-sample.mkv', '%s-trailer.mov', 'folder.jpg', '%s-fanart.jpg', 'Subs/%s.idx']
+
+
+def createLibrary(folder, movies):
+    ''' Movie file paths and leftover file paths of a release folder per movie '''
+
+    random.seed(movies)
+    movie_files = []
+    leftovers = []
+    titles = set()
+
+    while len(titles) < movies:
+        titles.add((' '.join(random.sample(words, random.randint(1, 4))).title(), random.randint(1950, 2011)))
+
+    for title, year in sorted(titles):
+        release = '%s.%s.720p.BluRay.x264-GRP' % (title.replace(' ', '.'), year)
+        path = os.path.join(folder, release)
+
+        movie_files.append(os.path.join(path, release + '.mkv'))
+        for extra in extras:
+            leftovers.append(os.path.join(path, extra.replace('%s', release)))
+
+    return movie_files, leftovers
+
+def groupIndexed(scanner, folder, movie_files, leftovers):
+    from couchpotato.core.plugins.scanner.main import IdentifierIndex
+
+    leftovers = IdentifierIndex(dict([(file, scanner.createStringIdentifier(file, folder)) for file in leftovers]))
+    return groupAll(scanner, folder, movie_files, lambda identifier: leftovers.pop(identifier))
+
+def groupLinear(scanner, folder, movie_files, leftovers):
+    ''' The scanner before the IdentifierIndex, every lookup recreates the
+    identifier of every leftover file '''
+
+    pile = [set(sorted(leftovers, reverse = True))]
+    def find(identifier):
+        found = set(filter(lambda s: identifier in scanner.createStringIdentifier(s, folder), pile[0]))
+        pile[0] = pile[0] - found
+        return found
+
+    return groupAll(scanner, folder, movie_files, find)
+
+def groupAll(scanner, folder, movie_files, find):
+
+    groups = {}
+    for file in movie_files:
+        groups.setdefault(scanner.createStringIdentifier(file, folder), [])
+
+    id_handles = [
+        None,
+        lambda x: os.path.split(x)[-1],
+        os.path.dirname,
+    ]
+
+    for handler in id_handles:
+        for identifier, files in groups.iteritems():
+            identifier = handler(identifier) if handler else identifier
+            if len(identifier) > 0:
+                files.extend(find(identifier))
+
+    return dict([(identifier, sorted(files)) for identifier, files in groups.iteritems()])
+
+def measure(root):
+    from couchpotato.core.plugins.scanner.main import Scanner
+    options = measure.options
+
+    # Only the identifier helpers are used, they don't need a running app
+    scanner = Scanner.__new__(Scanner)
+
+    folder = '/media/downloads/'
+    movie_files, leftovers = createLibrary(folder, options.movies)
+    print '  %s movies, %s files' % (len(movie_files), len(movie_files) + len(leftovers))
+
+    start = time.time()
+    indexed = groupIndexed(scanner, folder, movie_files, leftovers)
+    print '  %-20s %8.2fs' % ('identifier index', time.time() - start)
+
+    if not options.skip_linear:
+        start = time.time()
+        linear = groupLinear(scanner, folder, movie_files, leftovers)
+        print '  %-20s %8.2fs' % ('linear scan', time.time() - start)
+
+        if indexed != linear:
+            raise SystemExit('The identifier index found different groups then the linear scan')
+        print '  groups are identical'
+
+if __name__ == '__main__':
+    measure.options = getOptions('%prog [--movies N] [--skip-linear]', [
+        (['--movies'], {'dest': 'movies', 'type': 'int', 'default': 100, 'help': 'Movies in the synthetic library'}),
+        (['--skip-linear'], {'dest': 'skip_linear', 'action': 'store_true', 'help': 'Only time the identifier index'}),
+    ])
+    run(__file__, measure.options, measure)
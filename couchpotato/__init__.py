@@ -1,5 +1,6 @@
 from couchpotato.core.auth import requires_auth
-from couchpotato.core.event import fireEvent
+from couchpotato.core.event import fireEvent, pools
+from couchpotato.core.helpers.variable import tryInt
 from couchpotato.core.logger import CPLog
 from couchpotato.environment import Env
 from flask.app import Flask
@@ -8,10 +9,14 @@ from flask.globals import request
 from flask.helpers import url_for
 from flask.templating import render_template
 from sqlalchemy.engine import create_engine
+from sqlalchemy.interfaces import PoolListener
 from sqlalchemy.orm import scoped_session
 from sqlalchemy.orm.session import sessionmaker
+from sqlalchemy.pool import QueuePool
 from werkzeug.utils import redirect
 import os
+import threading
+import traceback
 
 log = CPLog(__name__)
 
@@ -19,12 +24,83 @@ app = Flask(__name__)
 web = Blueprint('web', __name__)
 
 
+class SQLiteTuning(PoolListener):
+    ''' Applies the pragma profile from the database settings to every new connection '''
+
+    journal_modes = ['wal', 'delete', 'truncate', 'persist']
+    synchronous = ['full', 'normal', 'off']
+
+    def connect(self, dbapi_con, con_record):
+
+        pragmas = []
+
+        journal_mode = str(Env.setting('db_journal_mode', default = 'wal')).lower()
+        if journal_mode in self.journal_modes:
+            pragmas.append('journal_mode = %s' % journal_mode)
+
+        synchronous = str(Env.setting('db_synchronous', default = 'normal')).lower()
+        if synchronous in self.synchronous:
+            pragmas.append('synchronous = %s' % synchronous)
+
+        pragmas.append('busy_timeout = %d' % tryInt(Env.setting('db_busy_timeout', default = 5000)))
+        pragmas.append('cache_size = %d' % -(tryInt(Env.setting('db_cache_size', default = 16)) * 1024))
+        pragmas.append('temp_store = %s' % ('memory' if Env.setting('db_temp_store_memory', default = True) else 'default'))
+        pragmas.append('mmap_size = %d' % (tryInt(Env.setting('db_mmap_size', default = 64)) * 1048576))
+
+        cursor = dbapi_con.cursor()
+        for pragma in pragmas:
+            try:
+                cursor.execute('PRAGMA %s' % pragma)
+            except:
+                log.error('Failed setting "PRAGMA %s": %s' % (pragma, traceback.format_exc()))
+        cursor.close()
+
+_engine = None
+_session = None
+_lock = threading.Lock()
+
 def get_session(engine = None):
-    engine = engine if engine else get_engine()
-    return scoped_session(sessionmaker(bind = engine))
+    global _session
+
+    if engine:
+        return scoped_session(sessionmaker(bind = engine))
+
+    # One thread local session registry for the whole app
+    if not _session:
+        _lock.acquire()
+        try:
+            if not _session:
+                _session = scoped_session(sessionmaker(bind = get_engine()))
+        finally:
+            _lock.release()
+
+    return _session
 
 def get_engine():
-    return create_engine(Env.get('db_path') + '?check_same_thread=False', echo = False)
+    global _engine
+
+    # Connections are shared by the web server, scheduler and event worker threads
+    if not _engine:
+        _lock.acquire()
+        try:
+            if not _engine:
+                _engine = create_engine(Env.get('db_path') + '?check_same_thread=False', echo = False,
+                                        poolclass = QueuePool, pool_size = 10, max_overflow = 30,
+                                        listeners = [SQLiteTuning()])
+        finally:
+            _lock.release()
+
+    return _engine
+
+def remove_session(*args):
+    ''' Closes the session of the current thread, returning its connection to the pool '''
+    if _session:
+        _session.remove()
+
+# Clean up after every web request and background event job
+app.teardown_request(remove_session)
+for worker_pool in pools:
+    worker_pool.cleanup.append(remove_session)
 
 def addView(route, func, static = False):
     web.add_url_rule(route + ('' if static else '/'), endpoint = route if route else 'index', view_func = func)
@@ -75,6 +75,14 @@ config = [{
                     'label': 'Url Base',
                     'description': 'When using mod_proxy use this to append the url with this.',
                 },
+                {
+                    'advanced': True,
+                    'name': 'log_event_stats',
+                    'default': 0,
+                    'type': 'bool',
+                    'label': 'Log event stats',
+                    'description': 'Write event call counts and timings to the log on shutdown.',
+                },
                 {
                     'name': 'permission_folder',
                     'default': 0755,
@@ -89,5 +97,61 @@ config = [{
                 },
             ],
         },
+        {
+            'tab': 'general',
+            'name': 'database',
+            'label': 'Database',
+            'description': 'SQLite tuning, applied to new connections after a restart.',
+            'advanced': True,
+            'options': [
+                {
+                    'name': 'db_journal_mode',
+                    'default': 'wal',
+                    'type': 'dropdown',
+                    'values': [('WAL', 'wal'), ('Delete', 'delete'), ('Truncate', 'truncate'), ('Persist', 'persist')],
+                    'label': 'Journal mode',
+                    'description': 'WAL lets the web UI read while the scanner or searcher is writing.',
+                },
+                {
+                    'name': 'db_synchronous',
+                    'default': 'normal',
+                    'type': 'dropdown',
+                    'values': [('Full', 'full'), ('Normal', 'normal'), ('Off', 'off')],
+                    'label': 'Synchronous',
+                    'description': 'Normal is safe with WAL and syncs a lot less often.',
+                },
+                {
+                    'name': 'db_busy_timeout',
+                    'default': 5000,
+                    'type': 'int',
+                    'unit': 'ms',
+                    'label': 'Busy timeout',
+                    'description': 'How long to wait for a lock before giving up with "database is locked".',
+                },
+                {
+                    'name': 'db_cache_size',
+                    'default': 16,
+                    'type': 'int',
+                    'unit': 'MB',
+                    'label': 'Cache size',
+                    'description': 'Page cache per connection.',
+                },
+                {
+                    'name': 'db_temp_store_memory',
+                    'default': 1,
+                    'type': 'bool',
+                    'label': 'Temp store in memory',
+                    'description': 'Keep temporary tables and indices in memory.',
+                },
+                {
+                    'name': 'db_mmap_size',
+                    'default': 64,
+                    'type': 'int',
+                    'unit': 'MB',
+                    'label': 'Memory map',
+                    'description': 'Read the database through a memory map of this size. 0 to disable.',
+                },
+            ],
+        },
     ],
 }]
@@ -1,5 +1,6 @@
 from couchpotato.api import addApiView
-from couchpotato.core.event import fireEvent, addEvent
+from couchpotato.core.event import fireEvent, addEvent, getEventStats
+from couchpotato.core.helpers.request import jsonified
 from couchpotato.core.logger import CPLog
 from couchpotato.core.plugins.base import Plugin
 from couchpotato.environment import Env
@@ -15,6 +16,8 @@ class Core(Plugin):
     def __init__(self):
         addApiView('app.shutdown', self.shutdown)
         addApiView('app.restart', self.restart)
+        addApiView('debug.events', self.eventStats)
+        addApiView('debug.query_plans', self.queryPlans)
 
         self.removeRestartFile()
 
@@ -43,6 +46,9 @@ class Core(Plugin):
 
             time.sleep(1)
 
+        if self.conf('log_event_stats'):
+            self.logEventStats()
+
         if restart:
             self.createFile(self.restartFilePath(), 'This is the most suckiest way to register if CP is restarted. Ever...')
 
@@ -51,6 +57,29 @@ class Core(Plugin):
         except:
             log.error('Failed shutting down the server')
 
+    def eventStats(self):
+        return jsonified(getEventStats())
+
+    def queryPlans(self):
+        from couchpotato.core.settings.model import checkQueryPlans
+
+        failed = checkQueryPlans()
+        for query in failed:
+            log.error('Full table scan for "%s": %s' % (query, ', '.join(failed[query])))
+
+        return jsonified({
+            'success': len(failed) == 0,
+            'scans': failed,
+        })
+
+    def logEventStats(self):
+        event_stats = getEventStats()
+        for type in ['events', 'handlers']:
+            stats = event_stats[type]
+            for name in sorted(stats, key = lambda x: stats[x]['total'], reverse = True):
+                s = stats[name]
+                log.info('%s %s: %s calls, %s errors, %s cached, %s async, total %sms, p50 %sms, p95 %sms, p99 %sms, max %sms' % (type[:-1], name, s['count'], s['errors'], s['cached'], s['async'], s['total'], s['p50'], s['p95'], s['p99'], s['max']))
+
     def removeRestartFile(self):
         try:
             os.remove(self.restartFilePath())
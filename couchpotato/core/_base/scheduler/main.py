@@ -1,4 +1,5 @@
 from apscheduler.scheduler import Scheduler as Sched
+from couchpotato import remove_session
 from couchpotato.core.event import addEvent
 from couchpotato.core.logger import CPLog
 from couchpotato.core.plugins.base import Plugin
@@ -42,7 +43,7 @@ class Scheduler(Plugin):
             try:
                 self.remove(identifier)
                 cron = self.crons[identifier]
-                job = self.sched.add_cron_job(cron['handle'], day = cron['day'], hour = cron['hour'], minute = cron['minute'])
+                job = self.sched.add_cron_job(self.runJob, args = [cron['handle']], day = cron['day'], hour = cron['hour'], minute = cron['minute'])
                 cron['job'] = job
             except ValueError, e:
                 log.error("Failed adding cronjob: %s" % e)
@@ -52,7 +53,7 @@ class Scheduler(Plugin):
             try:
                 self.remove(identifier)
                 interval = self.intervals[identifier]
-                job = self.sched.add_interval_job(interval['handle'], hours = interval['hours'], minutes = interval['minutes'], seconds = interval['seconds'], repeat = interval['repeat'])
+                job = self.sched.add_interval_job(self.runJob, args = [interval['handle']], hours = interval['hours'], minutes = interval['minutes'], seconds = interval['seconds'], repeat = interval['repeat'])
                 interval['job'] = job
             except ValueError, e:
                 log.error("Failed adding interval cronjob: %s" % e)
@@ -61,6 +62,14 @@ class Scheduler(Plugin):
         self.sched.start()
         self.started = True
 
+    def runJob(self, handle):
+
+        # Every job runs in its own thread, return its connection when done
+        try:
+            handle()
+        finally:
+            remove_session()
+
     def stop(self):
 
         if self.started:
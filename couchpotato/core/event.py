@@ -1,115 +1,401 @@
-from axl.axel import Event
+from __future__ import with_statement
+from axl.axel import Event, WorkerPool
 from couchpotato.core.helpers.variable import mergeDicts
 from couchpotato.core.logger import CPLog
+import sys
 import threading
+import time
 import traceback
 
 log = CPLog(__name__)
 events = {}
+caches = {}
+plugin_handlers = {}
 
+# Shared by all events, so firing doesn't start new threads. Asynchronous
+# fires run jobs like library.update and searcher.single that can take minutes,
+# they get their own workers so they can't starve the fires that are waited on.
+pool = WorkerPool(threads = 20)
+async_pool = WorkerPool(threads = 20)
+pools = [pool, async_pool]
 
-def addEvent(name, handler, priority = 0):
+
+class FrozenDict(dict):
+    ''' Dict that can't be changed, copy() returns a normal dict '''
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('Shared result, make a copy before changing it')
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def copy(self):
+        return dict(self)
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        from copy import deepcopy
+        return deepcopy(dict(self), memo)
+
+def freeze(value):
+    ''' Read-only copy of nested dicts and lists, so a shared result can't be changed by one of its users '''
+    if isinstance(value, dict):
+        return FrozenDict([(k, freeze(v)) for k, v in value.iteritems()])
+    elif isinstance(value, (list, tuple)):
+        return tuple([freeze(v) for v in value])
+
+    return value
+
+
+class EventCache(object):
+    ''' Remembers the results of fireEvent for an event.
+    timeout: seconds a result stays valid, 0 to keep it until cleared
+    max: amount of results kept, the oldest result is dropped first
+    key: function that gets the event arguments and returns a hashable key,
+         defaults to the arguments themselves
+    freeze: store read-only snapshots of the results '''
+
+    def __init__(self, timeout = 300, max = 100, key = None, freeze = False):
+        self.timeout = timeout
+        self.max = max
+        self.key_func = key
+        self.freeze = freeze
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def key(self, args, kwargs):
+        if self.key_func:
+            key = self.key_func(*args, **kwargs)
+        else:
+            key = (args, tuple(sorted(kwargs.iteritems())) if kwargs else ())
+
+        try:
+            hash(key)
+        except TypeError:
+            return None
+
+        return key
+
+    def get(self, key):
+        with self.lock:
+            found = self.results.get(key)
+            if found and (not found[0] or found[0] > time.time()):
+                return True, found[1]
+
+        return False, None
+
+    def set(self, key, value):
+        if self.freeze:
+            value = freeze(value)
+
+        with self.lock:
+            now = time.time()
+            self.results.pop(key, None)
+            while self.results and len(self.results) >= self.max:
+                oldest = min(self.results, key = lambda k: self.results[k][2])
+                del self.results[oldest]
+
+            self.results[key] = (now + self.timeout if self.timeout else 0, value, now)
+
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+
+
+class EventStats(object):
+    ''' Fire and handler counts, errors and latency histograms '''
+
+    # Upper bounds of the latency buckets, in ms
+    buckets = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, float('inf')]
+
+    def __init__(self):
+        self.events = {}
+        self.handlers = {}
+        self.lock = threading.Lock()
+
+    def fired(self, name, start, failed = False, cached = False):
+        self.add(self.events, name, time.time() - start, failed, cached)
+
+    def firedAsync(self, name):
+        with self.lock:
+            self.get(self.events, name)['async'] += 1
+
+    def handled(self, name, start, failed = False):
+        self.add(self.handlers, name, time.time() - start, failed)
+
+    def get(self, stats, name):
+        try:
+            return stats[name]
+        except KeyError:
+            return stats.setdefault(name, {
+                'count': 0, 'errors': 0, 'cached': 0, 'async': 0,
+                'total': 0.0, 'max': 0.0,
+                'histogram': [0] * len(self.buckets),
+            })
+
+    def add(self, stats, name, took, failed = False, cached = False):
+        took = took * 1000
+
+        i = 0
+        while took > self.buckets[i]:
+            i += 1
+
+        with self.lock:
+            s = self.get(stats, name)
+            s['count'] += 1
+            s['total'] += took
+            s['histogram'][i] += 1
+            if took > s['max']: s['max'] = took
+            if failed: s['errors'] += 1
+            if cached: s['cached'] += 1
+
+    def percentile(self, s, p):
+        needed = s['count'] * p
+        seen = 0
+        for i, amount in enumerate(s['histogram']):
+            seen += amount
+            if seen >= needed:
+                return round(min(self.buckets[i], s['max']), 2)
+
+        return round(s['max'], 2)
+
+    def summary(self, stats):
+        with self.lock:
+            stats = dict([(name, dict(s, histogram = list(s['histogram']))) for name, s in stats.iteritems()])
+
+        summary = {}
+        for name, s in stats.iteritems():
+            summary[name] = {
+                'count': s['count'],
+                'errors': s['errors'],
+                'cached': s['cached'],
+                'async': s['async'],
+                'total': round(s['total'], 2),
+                'avg': round(s['total'] / s['count'], 2) if s['count'] else 0,
+                'max': round(s['max'], 2),
+                'p50': self.percentile(s, 0.5) if s['count'] else 0,
+                'p95': self.percentile(s, 0.95) if s['count'] else 0,
+                'p99': self.percentile(s, 0.99) if s['count'] else 0,
+            }
+
+        return summary
+
+    def all(self):
+        return {
+            'events': self.summary(self.events),
+            'handlers': self.summary(self.handlers),
+        }
+
+stats = EventStats()
+
+
+def addEvent(name, handler, priority = 0, parallel = False, memoize = None, timeout = 0):
 
     if events.get(name):
         e = events[name]
     else:
-        e = events[name] = Event(threads = 20, exc_info = True, traceback = True, lock = threading.RLock())
+        e = events[name] = Event(pool = pool, async_pool = async_pool, threads = 20, exc_info = True, traceback = True)
+        e.error_handler = errorHandler
+
+    # Run all handlers of this event at the same time, for I/O bound events
+    if parallel:
+        e.parallel = True
+
+    # Remember results, memoize is a dict with EventCache options
+    if memoize is not None and not caches.get(name):
+        caches[name] = EventCache(**memoize)
+
+    # Plugins keep track of their running handlers
+    parent = getattr(handler, 'im_self', None)
+    if hasattr(parent, 'beforeCall'):
+        handler_name = '%s.%s' % (parent.getName(), handler.__name__)
+    else:
+        handler_name = '%s.%s' % (getattr(handler, '__module__', ''), getattr(handler, '__name__', handler))
+        parent = None
 
     def createHandle(*args, **kwargs):
 
+        start = time.time()
+        failed = True
+        if parent: parent.beforeCall(handler)
         try:
-            parent = handler.im_self
-            parent.beforeCall(handler)
-            h = handler(*args, **kwargs)
-            parent.afterCall(handler)
-        except:
             h = handler(*args, **kwargs)
+            failed = False
+            return h
+        finally:
+            if parent: parent.afterCall(handler)
+            stats.handled(handler_name, start, failed)
 
-        return h
+    createHandle.__name__ = str(handler_name)
+    createHandle.handler = handler
 
-    if name == 'app.initialize':
-        print 'test', priority
+    # Results of handlers that run longer then timeout seconds are ignored
+    handle = (createHandle, False, timeout)
+    e.handle(handle, priority = priority)
 
-    e.handle(createHandle, priority = priority)
+    # Remember plugin handlers, so they can be detached when the plugin gets disabled
+    if parent:
+        plugin_handlers.setdefault(parent, []).append((name, handle, priority))
 
 def removeEvent(name, handler):
     e = events[name]
-    e -= handler
+    for handle in e.sorted_handlers():
+        if getattr(handle[0], 'handler', None) == handler:
+            e -= handle[0]
+
+def attachEvents(plugin):
+    for name, handle, priority in plugin_handlers.get(plugin, []):
+        events[name].handle(handle, priority = priority)
+
+def detachEvents(plugin, keep = []):
+    for name, handle, priority in plugin_handlers.get(plugin, []):
+        if name not in keep:
+            try:
+                events[name].unhandle(handle)
+            except ValueError:
+                pass
 
 def fireEvent(name, *args, **kwargs):
     #log.debug('Firing "%s": %s, %s' % (name, args, kwargs))
+    start = time.time()
     try:
 
         # Return single handler
-        single = False
-        try:
-            del kwargs['single']
-            single = True
-        except: pass
+        single = kwargs.pop('single', False)
 
         # Merge items
-        merge = False
-        try:
-            del kwargs['merge']
-            merge = True
-        except: pass
+        merge = kwargs.pop('merge', False)
 
         e = events[name]
-        e.asynchronous = False
-        result = e(*args, **kwargs)
-
-        if single and not merge:
-            results = None
-
-            # Loop over results, stop when first not None result is found.
-            for r in result:
-                if r[0] is True and r[1] is not None:
-                    results = r[1]
-                    break
-                elif r[1]:
-                    errorHandler(r[1])
-                else:
-                    log.debug('Assume disabled plugin: %s' % r[2])
 
+        # Return remembered result
+        cache = caches.get(name)
+        if cache:
+            cache_key = cache.key(args, kwargs)
+            if cache_key is not None:
+                cache_key = (single, merge, cache_key)
+                found, results = cache.get(cache_key)
+                if found:
+                    stats.fired(name, start, cached = True)
+                    return results
+
+        # Call a lone handler directly, skipping the dispatcher
+        handlers = e.sorted_handlers()
+        if len(handlers) == 1 and not handlers[0][1] and handlers[0][2] <= 0:
+            handler = handlers[0][0]
+            try:
+                result = ((True, handler(*args, **kwargs), handler),)
+            except Exception:
+                result = ((False, sys.exc_info(), handler),)
+        # Stop at the first handler that returns something
+        elif single and not merge:
+            result = e.first(*args, **kwargs) or ()
         else:
-            results = []
-            for r in result:
-                if r[0] == True and r[1]:
-                    results.append(r[1])
-                elif r[1]:
-                    errorHandler(r[1])
-
-            # Merge
-            if merge and len(results) > 0:
-                # Dict
-                if type(results[0]) == dict:
-                    merged = {}
-                    for result in results:
-                        merged = mergeDicts(merged, result)
-
-                    results = merged
-                # Lists
-                elif type(results[0]) == list:
-                    merged = []
-                    for result in results:
-                        merged += result
-
-                    results = merged
+            result = e.dispatch(False, *args, **kwargs) or ()
+
+        results, failed = processResults(result, single, merge)
+
+        if cache and cache_key is not None and not failed:
+            results = cache.set(cache_key, results)
+
+        stats.fired(name, start, failed)
 
         return results
     except KeyError, e:
         pass
     except Exception:
+        stats.fired(name, start, True)
         log.error('%s: %s' % (name, traceback.format_exc()))
 
+def processResults(result, single = False, merge = False):
+    """ Turns the execution results of the handlers into the return value
+    of fireEvent, returns it together with a boolean if a handler failed. """
+
+    failed = False
+    if single and not merge:
+        results = None
+
+        # Loop over results, stop when first not None result is found.
+        for r in result:
+            if r[0] is True and r[1] is not None:
+                results = r[1]
+                break
+            elif r[1]:
+                failed = True
+                errorHandler(r[1])
+            else:
+                log.debug('Assume disabled plugin: %s' % r[2])
+
+    else:
+        results = []
+        for r in result:
+            if r[0] == True and r[1]:
+                results.append(r[1])
+            elif r[1]:
+                failed = True
+                errorHandler(r[1])
+
+        # Merge
+        if merge and len(results) > 0:
+            # Dict
+            if type(results[0]) == dict:
+                merged = {}
+                for result in results:
+                    merged = mergeDicts(merged, result)
+
+                results = merged
+            # Lists
+            elif type(results[0]) == list:
+                merged = []
+                for result in results:
+                    merged += result
+
+                results = merged
+
+    return results, failed
+
+def fireEventFutures(name, *args, **kwargs):
+    """ Starts all handlers on the worker pool and returns a list of futures,
+    one per handler in priority order. Use gatherFutures to get the results. """
+    try:
+        e = events[name]
+        futures = e.submit(*args, **kwargs)
+        stats.firedAsync(name)
+        return futures
+    except KeyError:
+        return []
+
+def gatherFutures(futures, timeout = None, single = False, merge = False):
+    """ Waits at most timeout seconds for all futures, combines the results
+    like fireEvent does. Handlers that didn't start in time are cancelled,
+    handlers that are still running are ignored. """
+
+    deadline = time.time() + timeout if timeout else None
+
+    result = []
+    for future in futures:
+        if deadline:
+            future.wait(max(0, deadline - time.time()))
+
+        if future.wait(None if not deadline else 0) and not future.cancelled():
+            if future.result() is not None:
+                result.append(future.result())
+        elif future.cancel():
+            log.info('Cancelled %s, it didn\'t start within %s seconds' % (future.name, timeout))
+        else:
+            log.info('Ignoring %s, still running after %s seconds' % (future.name, timeout))
+
+    return processResults(result, single, merge)[0]
+
 def fireEventAsync(name, *args, **kwargs):
     #log.debug('Async "%s": %s, %s' % (name, args, kwargs))
     try:
         e = events[name]
-        e.asynchronous = True
-        e.error_handler = errorHandler
-
-        e(*args, **kwargs)
+        e.dispatch(True, *args, **kwargs)
+        stats.firedAsync(name)
         return True
     except Exception, e:
         log.error('%s: %s' % (name, e))
@@ -120,3 +406,14 @@ def errorHandler(error):
 
 def getEvent(name):
     return events[name]
+
+def getEventStats():
+    return stats.all()
+
+def clearEventCache(*names):
+    for name in names:
+        cache = caches.get(name)
+        if cache:
+            cache.clear()
+
+addEvent('event.clear_cache', clearEventCache)
@@ -4,6 +4,7 @@ from flask.helpers import json
 from libs.werkzeug.urls import url_decode
 import flask
 import re
+import types
 
 def getParams():
 
@@ -71,3 +72,64 @@ def jsonified(*args, **kwargs):
         return padded_jsonify(callback, *args, **kwargs)
     else:
         return jsonify('text/javascript' if Env.doDebug() else 'application/json', *args, **kwargs)
+
+def iterJson(value):
+    ''' Encode value as JSON in pieces. Generators are streamed item by item,
+    dicts key by key, every other value is encoded in one go. '''
+
+    if isinstance(value, types.GeneratorType):
+        yield '['
+        first = True
+        for item in value:
+            if not first:
+                yield ', '
+            first = False
+            for piece in iterJson(item):
+                yield piece
+        yield ']'
+
+    elif isinstance(value, dict):
+        yield '{'
+        first = True
+        for key, item in value.iteritems():
+            if not first:
+                yield ', '
+            first = False
+            yield json.dumps(key) + ': '
+            for piece in iterJson(item):
+                yield piece
+        yield '}'
+
+    else:
+        yield json.dumps(value)
+
+def bufferedJson(value, callback = None, size = 16384):
+    ''' Join the JSON pieces into chunks of about size bytes '''
+
+    if callback:
+        yield str(callback) + '('
+
+    chunk = []
+    length = 0
+    for piece in iterJson(value):
+        chunk.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield ''.join(chunk)
+            chunk = []
+            length = 0
+
+    if chunk:
+        yield ''.join(chunk)
+
+    if callback:
+        yield ')'
+
+def jsonStreamed(*args, **kwargs):
+    ''' Like jsonified, but sends the response while it's being encoded.
+    Use a generator for long lists, so the items are only created when sent. '''
+    from couchpotato.environment import Env
+    callback = getParam('json_callback', None)
+    mimetype = 'text/javascript' if callback or Env.doDebug() else 'application/json'
+
+    return getattr(current_app, 'response_class')(bufferedJson(dict(*args, **kwargs), callback), mimetype = mimetype)
@@ -0,0 +1,45 @@
+""" Index the columns the plugins look rows up by. New databases already get
+these from the model, so only create what's missing. """
+
+indexes = [
+    ('ix_library_identifier', 'library', 'identifier'),
+    ('ix_libraryinfo_identifier', 'libraryinfo', 'identifier'),
+    ('ix_release_identifier', 'release', 'identifier'),
+    ('ix_releaseinfo_identifier', 'releaseinfo', 'identifier'),
+    ('ix_fileproperty_identifier', 'fileproperty', 'identifier'),
+    ('ix_movie_files__file_movie_file_id', 'movie_files__file_movie', 'file_id'),
+    ('ix_release_files__file_release_file_id', 'release_files__file_release', 'file_id'),
+    ('ix_library_files__file_library_file_id', 'library_files__file_library', 'file_id'),
+
+    # Foreign keys Elixir indexes by default, in case an older version didn't
+    ('ix_movie_library_id', 'movie', 'library_id'),
+    ('ix_movie_status_id', 'movie', 'status_id'),
+    ('ix_movie_profile_id', 'movie', 'profile_id'),
+    ('ix_library_status_id', 'library', 'status_id'),
+    ('ix_libraryinfo_library_id', 'libraryinfo', 'library_id'),
+    ('ix_librarytitle_libraries_id', 'librarytitle', 'libraries_id'),
+    ('ix_language_titles_id', 'language', 'titles_id'),
+    ('ix_release_movie_id', 'release', 'movie_id'),
+    ('ix_release_status_id', 'release', 'status_id'),
+    ('ix_release_quality_id', 'release', 'quality_id'),
+    ('ix_releaseinfo_release_id', 'releaseinfo', 'release_id'),
+    ('ix_profiletype_quality_id', 'profiletype', 'quality_id'),
+    ('ix_profiletype_profile_id', 'profiletype', 'profile_id'),
+    ('ix_file_type_id', 'file', 'type_id'),
+    ('ix_fileproperty_file_id', 'fileproperty', 'file_id'),
+    ('ix_history_release_id', 'history', 'release_id'),
+    ('ix_renamehistory_file_id', 'renamehistory', 'file_id'),
+]
+
+def upgrade(migrate_engine):
+    tables = [row[0] for row in migrate_engine.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+    for name, table, column in indexes:
+        if table in tables:
+            migrate_engine.execute('CREATE INDEX IF NOT EXISTS %s ON %s (%s)' % (name, table, column))
+
+    migrate_engine.execute('ANALYZE')
+
+def downgrade(migrate_engine):
+    for name, table, column in indexes[:8]:
+        migrate_engine.execute('DROP INDEX IF EXISTS %s' % name)
@@ -0,0 +1,64 @@
+""" Move the ReleaseInfo and LibraryInfo rows into a JSON info column on
+their release and library, then drop the old tables. """
+
+from flask.helpers import json
+
+tables = [
+    ('release', 'releaseinfo', 'release_id'),
+    ('library', 'libraryinfo', 'library_id'),
+]
+
+def getTables(migrate_engine):
+    return [row[0] for row in migrate_engine.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+def upgrade(migrate_engine):
+    existing = getTables(migrate_engine)
+
+    for table, info_table, key in tables:
+        if table not in existing:
+            continue
+
+        columns = [row[1] for row in migrate_engine.execute('PRAGMA table_info(%s)' % table)]
+        if 'info' not in columns:
+            migrate_engine.execute('ALTER TABLE %s ADD COLUMN info TEXT' % table)
+
+        if info_table not in existing:
+            continue
+
+        info = {}
+        for parent_id, identifier, value in migrate_engine.execute('SELECT %s, identifier, value FROM %s WHERE %s IS NOT NULL ORDER BY id' % (key, info_table, key)):
+            info.setdefault(parent_id, {})[identifier] = value
+
+        conn = migrate_engine.connect()
+        trans = conn.begin()
+        try:
+            if info:
+                conn.execute('UPDATE %s SET info = ? WHERE id = ?' % table,
+                             [(json.dumps(info[parent_id], separators = (',', ':')), parent_id) for parent_id in info])
+            conn.execute('DROP TABLE %s' % info_table)
+            trans.commit()
+        except:
+            trans.rollback()
+            raise
+        finally:
+            conn.close()
+
+    # Give the space of the dropped tables back
+    migrate_engine.execute('VACUUM')
+
+def downgrade(migrate_engine):
+    existing = getTables(migrate_engine)
+
+    for table, info_table, key in tables:
+        if info_table not in existing:
+            migrate_engine.execute('CREATE TABLE %s (id INTEGER NOT NULL, identifier VARCHAR(50), value VARCHAR(255) NOT NULL, %s INTEGER, PRIMARY KEY (id))' % (info_table, key))
+            migrate_engine.execute('CREATE INDEX ix_%s_%s ON %s (%s)' % (info_table, key, info_table, key))
+            migrate_engine.execute('CREATE INDEX ix_%s_identifier ON %s (identifier)' % (info_table, info_table))
+
+        rows = []
+        for parent_id, info in migrate_engine.execute('SELECT id, info FROM %s WHERE info IS NOT NULL' % table):
+            for identifier, value in json.loads(info).iteritems():
+                rows.append((identifier, unicode(value), parent_id))
+
+        if rows:
+            migrate_engine.execute('INSERT INTO %s (identifier, value, %s) VALUES (?, ?, ?)' % (info_table, key), rows)
@@ -0,0 +1,12 @@
+""" Index the file property values, the scanner finds cached media info
+by the fingerprint property of a file. """
+
+def upgrade(migrate_engine):
+    tables = [row[0] for row in migrate_engine.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+    if 'fileproperty' in tables:
+        migrate_engine.execute('CREATE INDEX IF NOT EXISTS ix_fileproperty_value ON fileproperty (value)')
+        migrate_engine.execute('ANALYZE fileproperty')
+
+def downgrade(migrate_engine):
+    migrate_engine.execute('DROP INDEX IF EXISTS ix_fileproperty_value')
@@ -1,5 +1,6 @@
 from couchpotato import addView
-from couchpotato.core.event import fireEvent, addEvent
+from couchpotato.core.event import fireEvent, addEvent, attachEvents, \
+    detachEvents
 from couchpotato.core.helpers.variable import getExt
 from couchpotato.core.logger import CPLog
 from couchpotato.environment import Env
@@ -33,6 +34,21 @@ class Plugin(object):
     def registerPlugin(self):
         addEvent('app.shutdown', self.doShutdown)
         addEvent('plugin.running', self.isRunning)
+        addEvent(self.enabledEventName(), self.toggleEvents)
+
+        # Don't listen to events while disabled
+        if not Plugin.isEnabled(self):
+            self.toggleEvents()
+
+    def enabledEventName(self):
+        return 'setting.save.%s.%s' % (self.getName().lower(), self.enabled_option)
+
+    def toggleEvents(self, value = None):
+        if Plugin.isEnabled(self):
+            attachEvents(self)
+        else:
+            log.debug('Detaching events of disabled plugin %s' % self.getName())
+            detachEvents(self, keep = ['app.shutdown', 'plugin.running', self.enabledEventName()])
 
     def conf(self, attr, default = None):
         return Env.setting(attr, self.getName().lower(), default = default)
@@ -5,7 +5,7 @@ from couchpotato.core.helpers.encoding import toUnicode
 from couchpotato.core.helpers.variable import md5, getExt
 from couchpotato.core.logger import CPLog
 from couchpotato.core.plugins.base import Plugin
-from couchpotato.core.settings.model import FileType, File
+from couchpotato.core.settings.model import FileType, File, FileProperty
 from couchpotato.environment import Env
 from flask.helpers import send_from_directory
 from sqlalchemy.sql.expression import or_
@@ -21,7 +21,9 @@ class FileManager(Plugin):
     def __init__(self):
         addEvent('file.add', self.add)
         addEvent('file.download', self.download)
-        addEvent('file.types', self.getTypes)
+        addEvent('file.properties', self.getProperties)
+        addEvent('file.type', self.getType, memoize = {'timeout': 0, 'freeze': True})
+        addEvent('file.types', self.getTypes, memoize = {'timeout': 0, 'freeze': True})
 
         addApiView('file.cache/<path:file>', self.showImage)
 
@@ -64,7 +66,16 @@ class FileManager(Plugin):
         f.path = path
         f.part = part
         f.available = available
-        f.type_id = self.getType(type).id
+        f.type_id = fireEvent('file.type', type, single = True).get('id')
+
+        # Update the properties that are already there, add the others
+        existing = dict([(p.identifier, p) for p in f.properties])
+        for identifier, value in properties.iteritems():
+            prop = existing.get(identifier)
+            if not prop:
+                prop = FileProperty(identifier = identifier)
+                f.properties.append(prop)
+            prop.value = toUnicode(value)
 
         db.commit()
 
@@ -72,6 +83,17 @@ class FileManager(Plugin):
 
         return file_dict
 
+    def getProperties(self, identifier, value):
+        ''' All properties of the file that has a property "identifier" with this value '''
+
+        db = get_session()
+
+        prop = db.query(FileProperty).filter_by(identifier = identifier, value = toUnicode(value)).first()
+        if not prop:
+            return None
+
+        return dict([(p.identifier, p.value) for p in prop.file.properties])
+
     def getType(self, type):
 
         db = get_session()
@@ -88,7 +110,9 @@ class FileManager(Plugin):
             db.add(ft)
             db.commit()
 
-        return ft
+            fireEvent('event.clear_cache', 'file.types')
+
+        return ft.to_dict()
 
     def getTypes(self):
 
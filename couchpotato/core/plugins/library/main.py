@@ -9,7 +9,7 @@ log = CPLog(__name__)
 
 class LibraryPlugin(Plugin):
 
-    default_dict = {'titles': {}, 'files':{}, 'info':{}}
+    default_dict = {'titles': {}, 'files':{}}
 
     def __init__(self):
         addEvent('library.add', self.add)
@@ -16,13 +16,11 @@ class Logging(Plugin):
 
         # Reverse
         f = open(path, 'r')
-        lines = []
-        for line in f.readlines():
-            lines.insert(0, line)
+        lines = f.readlines()
+        f.close()
+        lines.reverse()
 
-        log = ''
-        for line in lines:
-            log += line
+        log = ''.join(lines)
 
         return jsonified({
             'success': True,
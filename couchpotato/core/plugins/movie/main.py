@@ -1,11 +1,14 @@
 from couchpotato import get_session
 from couchpotato.api import addApiView
 from couchpotato.core.event import fireEvent, fireEventAsync
-from couchpotato.core.helpers.request import getParams, jsonified
+from couchpotato.core.helpers.request import getParams, jsonified, \
+    jsonStreamed
+from couchpotato.core.helpers.variable import tryInt
 from couchpotato.core.plugins.base import Plugin
-from couchpotato.core.settings.model import Movie
+from couchpotato.core.settings.model import Movie, Library, LibraryTitle, \
+    eagerLoad
 from couchpotato.environment import Env
-from sqlalchemy.sql.expression import or_
+from sqlalchemy.sql.expression import or_, and_, func
 from urllib import urlencode
 
 
@@ -13,7 +16,7 @@ class MoviePlugin(Plugin):
 
     default_dict = {
         'profile': {'types': {'quality': {}}},
-        'releases': {'status': {}, 'quality': {}, 'files':{}, 'info': {}},
+        'releases': {'status': {}, 'quality': {}, 'files':{}},
         'library': {'titles': {}, 'files':{}},
         'files': {},
         'status': {}
@@ -38,16 +41,54 @@ class MoviePlugin(Plugin):
         if not isinstance(status, (list, tuple)):
             status = [status]
 
-        results = db.query(Movie).filter(or_(*[Movie.status.has(identifier = s) for s in status])).all()
+        offset = tryInt(params.get('offset', 0))
+        limit = tryInt(params.get('limit', 0))
+        starts_with = params.get('starts_with', '').strip().upper()
+        order = params.get('order', 'title')
+
+        # Only serialize the requested relations
+        movie_dict = self.default_dict
+        if params.get('fields'):
+            fields = [x.strip() for x in params.get('fields').split(',')]
+            movie_dict = dict([(x, self.default_dict[x]) for x in fields if x in self.default_dict])
+
+        # Default title, used for filtering and sorting
+        q = db.query(Movie) \
+            .outerjoin((LibraryTitle, and_(LibraryTitle.libraries_id == Movie.library_id, LibraryTitle.default == True))) \
+            .filter(or_(*[Movie.status.has(identifier = s) for s in status]))
+
+        if starts_with:
+            first_char = func.upper(func.substr(LibraryTitle.title, 1, 1))
+            if starts_with == '#':
+                q = q.filter(or_(first_char < 'A', first_char > 'Z'))
+            else:
+                q = q.filter(LibraryTitle.title.like(starts_with + '%'))
+
+        total = q.count()
+
+        if order == 'year':
+            q = q.outerjoin((Library, Library.id == Movie.library_id)).order_by(Library.year.desc(), Movie.id)
+        elif order == 'added':
+            q = q.order_by(Movie.id.desc())
+        else:
+            q = q.order_by(func.lower(LibraryTitle.title), Movie.id)
 
-        movies = []
-        for movie in results:
-            temp = movie.to_dict(self.default_dict)
-            movies.append(temp)
+        if offset:
+            q = q.offset(offset)
+        if limit:
+            q = q.limit(limit)
 
-        return jsonified({
+        results = q.options(*eagerLoad(Movie, movie_dict)).all()
+
+        # Only serialize a movie when it's sent. That happens after teardown_request
+        # removed the session, so to_dict can't lazy load anything: every relation
+        # in movie_dict has to be loaded by eagerLoad, see tests/test_movie_list.py
+        movies = (movie.to_dict(movie_dict) for movie in results)
+
+        return jsonStreamed({
             'success': True,
-            'empty': len(movies) == 0,
+            'empty': len(results) == 0,
+            'total': total,
             'movies': movies,
         })
 
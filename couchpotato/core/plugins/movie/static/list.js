@@ -3,30 +3,54 @@ var MovieList = new Class({
 	Implements: [Options],
 
 	options: {
-		navigation: false
+		navigation: false,
+		limit: 50,
+		order: 'title'
 	},
 
 	movies: [],
 	letters: {},
+	offset: 0,
+	total: null,
+	loading: false,
+	request: null,
+	request_id: 0,
+	starts_with: null,
 
 	initialize: function(options){
 		var self = this;
 		self.setOptions(options);
 
-		self.el = new Element('div.movies');
+		self.el = new Element('div.movies').addEvents({
+			'mouseenter:relay(.movie)': function(e, el){
+				el.addClass('hover');
+			},
+			'mouseleave:relay(.movie)': function(e, el){
+				el.removeClass('hover');
+			}
+		});
+
+		// Create the alphabet nav
+		if(self.options.navigation)
+			self.createNavigation();
+
 		self.getMovies();
+
+		// Load the next page when scrolling near the bottom
+		window.addEvent('scroll', self.checkScroll.bind(self));
 	},
 
 	create: function(){
 		var self = this;
 
-		self.el.empty();
+		// Remove the movies, keep the alphabet nav
+		self.el.getElements('.movie').destroy();
+	},
 
-		// Create the alphabet nav
-		if(self.options.navigation)
-			self.createNavigation();
+	addMovies: function(movies){
+		var self = this;
 
-		Object.each(self.movies, function(info){
+		Object.each(movies, function(info){
 
 			// Attach proper actions
 			var a = self.options.actions
@@ -43,15 +67,6 @@ var MovieList = new Class({
 				self.activateLetter(first_char);
 			}
 		});
-
-		self.el.addEvents({
-			'mouseenter:relay(.movie)': function(e, el){
-				el.addClass('hover');
-			},
-			'mouseleave:relay(.movie)': function(e, el){
-				el.removeClass('hover');
-			}
-		});
 	},
 
 	createNavigation: function(){
@@ -71,32 +86,94 @@ var MovieList = new Class({
 		chars.split('').each(function(c){
 			self.letters[c] = new Element('li', {
 				'text': c,
-				'class': 'letter_'+c
+				'class': 'letter_'+c,
+				'events': {
+					'click': function(){
+						self.filterLetter(c);
+					}
+				}
 			}).inject(self.alpha);
 		});
 
 	},
 
 	activateLetter: function(letter){
-		this.letters[letter].addClass('active');
+		letter = letter.toUpperCase();
+		(this.letters[letter] || this.letters['#']).addClass('active');
+	},
+
+	filterLetter: function(letter){
+		var self = this;
+
+		// Only get the movies starting with this letter, clicking it again shows all
+		self.starts_with = self.starts_with == letter ? null : letter;
+		Object.each(self.letters, function(el, c){
+			if(c == self.starts_with)
+				el.addClass('selected');
+			else
+				el.removeClass('selected');
+		});
+
+		self.update();
 	},
 
 	update: function(){
 		var self = this;
 
+		self.offset = 0;
+		self.total = null;
 		self.getMovies();
 	},
 
+	checkScroll: function(){
+		var self = this;
+
+		if(self.loading || !self.el.isVisible() || self.offset >= self.total)
+			return;
+
+		var bottom = self.el.getPosition().y + self.el.getSize().y;
+		if(window.getScroll().y + window.getSize().y > bottom - 300)
+			self.getMovies();
+	},
+
 	getMovies: function(){
 		var self = this;
 
-		Api.request('movie.list', {
+		// Only the last request is used, drop the page that is still loading
+		if(self.request)
+			self.request.cancel();
+
+		var request_id = ++self.request_id;
+		self.loading = true;
+
+		self.request = Api.request('movie.list', {
 			'data': {
-				'status': self.options.status
+				'status': self.options.status,
+				'offset': self.offset,
+				'limit': self.options.limit,
+				'starts_with': self.starts_with || '',
+				'order': self.options.order
 			},
 			'onComplete': function(json){
+				if(request_id != self.request_id)
+					return;
+
+				self.request = null;
+				self.loading = false;
+
+				if(self.offset == 0){
+					self.movies = [];
+					self.create();
+				}
+
 				self.store(json.movies);
-				self.create();
+				self.addMovies(json.movies);
+
+				self.offset += json.movies.length;
+				self.total = json.total;
+
+				// Fill the screen
+				self.checkScroll();
 			}
 		});
 	},
@@ -104,7 +181,7 @@ var MovieList = new Class({
 	store: function(movies){
 		var self = this;
 
-		self.movies = movies;
+		self.movies.append(movies);
 	},
 
 	toElement: function(){
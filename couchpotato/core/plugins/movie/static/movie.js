@@ -264,9 +264,7 @@ var ReleaseAction = new Class({
 	get: function(release, type){
 		var self = this;
 
-		return (release.info.filter(function(info){
-			return type == info.identifier
-		}).pick() || {}).value
+		return (release.info || {})[type]
 	},
 	
 	download: function(release){
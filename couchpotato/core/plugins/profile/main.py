@@ -13,7 +13,7 @@ log = CPLog(__name__)
 class ProfilePlugin(Plugin):
 
     def __init__(self):
-        addEvent('profile.all', self.all)
+        addEvent('profile.all', self.all, memoize = {'timeout': 0, 'freeze': True})
 
         addApiView('profile.save', self.save)
         addApiView('profile.save_order', self.saveOrder)
@@ -64,6 +64,8 @@ class ProfilePlugin(Plugin):
 
         db.commit()
 
+        fireEvent('event.clear_cache', 'profile.all')
+
         profile_dict = p.to_dict(deep = {'types': {}})
 
         return jsonified({
@@ -86,6 +88,8 @@ class ProfilePlugin(Plugin):
 
         db.commit()
 
+        fireEvent('event.clear_cache', 'profile.all')
+
         return jsonified({
             'success': True
         })
@@ -104,6 +108,8 @@ class ProfilePlugin(Plugin):
             db.delete(p)
             db.commit()
 
+            fireEvent('event.clear_cache', 'profile.all')
+
             success = True
         except Exception, e:
             message = 'Failed deleting Profile: %s' % e
@@ -153,4 +159,6 @@ class ProfilePlugin(Plugin):
 
             order += 1
 
+        fireEvent('event.clear_cache', 'profile.all')
+
         return True
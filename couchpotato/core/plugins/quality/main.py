@@ -28,8 +28,8 @@ class QualityPlugin(Plugin):
     pre_releases = ['cam', 'ts', 'tc', 'r5', 'scr']
 
     def __init__(self):
-        addEvent('quality.all', self.all)
-        addEvent('quality.single', self.single)
+        addEvent('quality.all', self.all, memoize = {'timeout': 0, 'freeze': True})
+        addEvent('quality.single', self.single, memoize = {'timeout': 0, 'freeze': True})
         addEvent('quality.guess', self.guess)
 
         addEvent('app.initialize', self.fill, priority = 10)
@@ -111,15 +111,19 @@ class QualityPlugin(Plugin):
             order += 1
             db.commit()
 
+        fireEvent('event.clear_cache', 'quality.all', 'quality.single')
+
         return True
 
-    def guess(self, files, extra = {}, loose = False):
+    def guess(self, files, extra = {}, loose = False, sizes = {}):
+
+        qualities = fireEvent('quality.all', single = True)
 
         for file in files:
-            size = (os.path.getsize(file) / 1024 / 1024)
+            size = (sizes.get(file) or os.path.getsize(file)) / 1024 / 1024
             words = re.split('\W+', file.lower())
 
-            for quality in self.all():
+            for quality in qualities:
 
                 # Check tags
                 if quality['identifier'] in words:
@@ -148,7 +152,7 @@ class QualityPlugin(Plugin):
 
 
         # Try again with loose testing
-        quality = self.guess(files, extra = extra, loose = True)
+        quality = self.guess(files, extra = extra, loose = True, sizes = sizes)
         if quality:
             return quality
 
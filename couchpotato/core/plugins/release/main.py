@@ -1,11 +1,14 @@
 from couchpotato import get_session
 from couchpotato.api import addApiView
 from couchpotato.core.event import fireEvent, addEvent
+from couchpotato.core.helpers.encoding import toUnicode
 from couchpotato.core.helpers.request import getParam, jsonified
+from couchpotato.core.helpers.variable import md5
 from couchpotato.core.logger import CPLog
 from couchpotato.core.plugins.base import Plugin
 from couchpotato.core.settings.model import File, Release as Relea, Movie
 from sqlalchemy.sql.expression import and_, or_
+import traceback
 
 log = CPLog(__name__)
 
@@ -14,6 +17,7 @@ class Release(Plugin):
 
     def __init__(self):
         addEvent('release.add', self.add)
+        addEvent('release.add_results', self.addResults)
 
         addApiView('release.download', self.download)
         addApiView('release.delete', self.delete)
@@ -64,8 +68,56 @@ class Release(Plugin):
                 except Exception, e:
                     log.debug('Failed to attach "%s" to Relea: %s' % (file, e))
 
-        db.remove()
 
+    def addResults(self, results, movie_id = None, quality_id = None, status_id = None):
+        ''' Store new search results with their info, in a single transaction.
+        Results are identified by md5 of their url, known ones are skipped. '''
+
+        db = get_session()
+
+        new = {}
+        for result in results:
+            new[md5(result['url'])] = result
+
+        # Find the known results, in batches below the SQLite variable limit
+        identifiers = new.keys()
+        for i in range(0, len(identifiers), 500):
+            for (identifier,) in db.query(Relea.identifier).filter(Relea.identifier.in_(identifiers[i:i + 500])):
+                new.pop(identifier, None)
+
+        if not new:
+            return 0
+
+        try:
+            for identifier in new:
+                result = new[identifier]
+
+                # Keep the plain values of the result
+                info = {}
+                for key in result:
+                    value = result[key]
+                    if isinstance(value, str):
+                        value = toUnicode(value, 'utf-8')
+                    elif not isinstance(value, (unicode, int, long, float)):
+                        continue
+
+                    info[key] = value
+
+                db.add(Relea(
+                    identifier = identifier,
+                    movie_id = movie_id,
+                    quality_id = quality_id,
+                    status_id = status_id,
+                    info = info
+                ))
+
+            db.commit()
+        except:
+            log.error('Failed adding %s results: %s' % (len(new), traceback.format_exc()))
+            db.rollback()
+            return 0
+
+        return len(new)
 
     def saveFile(self, file, type = 'unknown', include_media_info = False):
 
@@ -73,7 +125,7 @@ class Release(Plugin):
 
         # Get media info for files
         if include_media_info:
-            properties = {}
+            properties = fireEvent('scanner.media_info', file, single = True) or {}
 
         # Check database and update/insert if necessary
         return fireEvent('file.add', path = file, part = self.getPartNumber(file), type = self.file_types[type], properties = properties, single = True)
@@ -99,12 +151,16 @@ class Release(Plugin):
 
         rel = db.query(Relea).filter_by(id = id).first()
         if rel:
-            item = {}
-            for info in rel.info:
-                item[info.identifier] = info.value
+            item = dict(rel.info or {})
 
             # Get matching provider
             provider = fireEvent('provider.belongs_to', item['url'], single = True)
+            if not provider:
+                log.error('No enabled provider found for: %s' % item['url'])
+                return jsonified({
+                    'success': False
+                })
+
             item['download'] = provider.download
 
             fireEvent('searcher.download', data = item, movie = rel.movie.to_dict({
@@ -52,6 +52,31 @@ config = [{
                     'unit': 'min(s)',
                     'description': 'Search for new movies inside the folder every X minutes.',
                 },
+                {
+                    'advanced': True,
+                    'name': 'watch',
+                    'label': 'Watch folder',
+                    'default': True,
+                    'type': 'bool',
+                    'description': 'Rename downloads as soon as they\'re finished, instead of checking the folder every X minutes.',
+                },
+                {
+                    'advanced': True,
+                    'name': 'watch_settle',
+                    'label': 'Finished after',
+                    'default': 15,
+                    'type': 'int',
+                    'unit': 'sec',
+                    'description': 'A download is finished when its files didn\'t change for this long.',
+                },
+                {
+                    'advanced': True,
+                    'name': 'watch_poll',
+                    'label': 'Network share',
+                    'default': False,
+                    'type': 'bool',
+                    'description': 'Keep checking the folder every X minutes while watching. Needed when another computer downloads to the folder over the network.',
+                },
             ],
         }, {
             'tab': 'renamer',
@@ -1,13 +1,15 @@
-from couchpotato import get_session
+from couchpotato import get_session, remove_session
 from couchpotato.core.event import addEvent, fireEvent, fireEventAsync
 from couchpotato.core.helpers.encoding import toUnicode
 from couchpotato.core.helpers.variable import getExt
 from couchpotato.core.logger import CPLog
 from couchpotato.core.plugins.base import Plugin
+from couchpotato.core.plugins.renamer.watcher import FolderWatcher
 from couchpotato.core.settings.model import Library, Movie
 import os.path
 import re
 import shutil
+import threading
 import traceback
 
 log = CPLog(__name__)
@@ -20,11 +22,74 @@ class Renamer(Plugin):
         addEvent('renamer.scan', self.scan)
         addEvent('app.load', self.scan)
 
-        fireEvent('schedule.interval', 'renamer.scan', self.scan, minutes = self.conf('run_every'))
+        self.scan_lock = threading.Lock()
+        self.watcher = None
+        self.watcher_lock = threading.Lock()
 
-    def scan(self):
+        # Rename downloads as soon as they're done, only look at the whole folder on start
+        addEvent('app.load', self.toggleWatcher)
+        for option in ['from', 'watch', 'watch_settle']:
+            addEvent('setting.save.renamer.%s' % option, self.toggleWatcher)
 
-        groups = fireEvent('scanner.scan', folder = self.conf('from'), single = True)
+        fireEvent('schedule.interval', 'renamer.scan', self.scheduledScan, minutes = self.conf('run_every'))
+
+    def toggleEvents(self, value = None):
+        super(Renamer, self).toggleEvents(value)
+        self.toggleWatcher()
+
+    def toggleWatcher(self, value = None):
+        ''' (Re)start the watcher with the current settings, stop it when the renamer or watching is disabled '''
+
+        self.watcher_lock.acquire()
+        try:
+            if self.watcher:
+                self.watcher.stop()
+                self.watcher = None
+
+            if self.isEnabled() and self.conf('watch') and os.path.isdir(self.conf('from') or ''):
+                self.watcher = FolderWatcher(self.conf('from'), self.scanReleases, settle = self.conf('watch_settle'))
+                self.watcher.start()
+        finally:
+            self.watcher_lock.release()
+
+    def doShutdown(self):
+        super(Renamer, self).doShutdown()
+        if self.watcher:
+            self.watcher.stop()
+
+    def scheduledScan(self):
+
+        # The watcher sees new downloads, unless they're written by another host to a network share
+        if self.watcher and not self.conf('watch_poll'):
+            return
+
+        self.scan()
+
+    def scanReleases(self, releases):
+        ''' Called by the watcher with the downloads that didn't change for a while '''
+        log.info('Finished downloading: %s' % ', '.join(releases))
+
+        # The watcher thread isn't a pool or scheduler thread, return its connection when done
+        try:
+            self.scan(releases)
+        finally:
+            remove_session()
+
+    def scan(self, releases = None):
+
+        # The watcher, the scheduler and the api can all start a scan
+        self.scan_lock.acquire()
+        try:
+            self.doScan(releases)
+        finally:
+            self.scan_lock.release()
+
+    def doScan(self, releases = None):
+
+        if releases is None:
+            groups = fireEvent('scanner.scan', folder = self.conf('from'), single = True)
+        else:
+            groups = fireEvent('scanner.scan', folder = self.conf('from'), files = releases, min_age = self.conf('watch_settle'), single = True)
         if groups is None: return
 
         destination = self.conf('to')
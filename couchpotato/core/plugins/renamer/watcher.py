@@ -0,0 +1,280 @@
+from couchpotato.core.logger import CPLog
+import os
+import select
+import struct
+import threading
+import time
+import traceback
+
+try:
+    import ctypes
+    import ctypes.util
+    libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno = True)
+    libc.inotify_init
+except:
+    libc = None
+
+log = CPLog(__name__)
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+class FolderWatcher(object):
+    ''' Hands the release folders (and loose files) directly inside a folder
+    to callback, once nothing changed in them for "settle" seconds.
+    Uses inotify when available, otherwise checks the folder every "poll" seconds. '''
+
+    incomplete_extensions = ['part', 'partial', 'crdownload', '!qb', '!ut', 'bts', 'tmp']
+    ignore_prefixes = ['.', '_UNKNOWN_']
+
+    def __init__(self, folder, callback, settle = 15, poll = 30):
+        self.folder = os.path.abspath(folder)
+        self.callback = callback
+        self.settle = settle
+        self.poll = poll
+
+        self.changed = {}
+        self.stopped = threading.Event()
+        self.backend = None
+
+    def start(self):
+        try:
+            self.backend = InotifyBackend(self.folder)
+        except Exception, e:
+            log.info('Inotify not available (%s), checking "%s" every %s seconds' % (e, self.folder, self.poll))
+            self.backend = PollBackend(self.folder, self.poll, self.stopped)
+
+        thread = threading.Thread(target = self.run)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.backend:
+            self.backend.wake()
+
+    def run(self):
+
+        while not self.stopped.isSet():
+
+            # Sleep until something changes or the next release has settled
+            timeout = None
+            if self.changed:
+                timeout = max(0, min(self.changed.values()) + self.settle - time.time())
+
+            try:
+                paths = self.backend.wait(timeout)
+            except:
+                log.error('Failed watching "%s", stopping: %s' % (self.folder, traceback.format_exc()))
+                break
+
+            now = time.time()
+            for path in paths:
+                release = self.getRelease(path)
+                if release:
+                    self.changed[release] = now
+
+            self.handOver(now)
+
+        self.backend.close()
+
+    def handOver(self, now):
+
+        settled = [release for release, changed in self.changed.iteritems() if changed + self.settle <= now]
+        if not settled:
+            return
+
+        ready = []
+        for release in settled:
+            if not os.path.exists(release):
+                del self.changed[release]
+                continue
+
+            # Check again after another "settle" seconds
+            files = self.getFiles(release)
+            if not self.isComplete(files):
+                log.debug('Still downloading, waiting for: %s' % release)
+                self.changed[release] = now
+                continue
+
+            # The scanner skips files changed less then "settle" seconds ago, wait for those
+            modified = self.lastModified(files)
+            if modified + self.settle > now:
+                self.changed[release] = modified
+                continue
+
+            del self.changed[release]
+            ready.append(release)
+
+        if ready:
+            try:
+                self.callback(ready)
+            except:
+                log.error('Failed handling changed releases %s: %s' % (ready, traceback.format_exc()))
+
+    def getRelease(self, path):
+        ''' The folder or file directly inside the watched folder that path belongs to '''
+
+        if not path.startswith(self.folder + os.path.sep):
+            return None
+
+        name = path[len(self.folder) + 1:].split(os.path.sep)[0]
+        for prefix in self.ignore_prefixes:
+            if name.startswith(prefix):
+                return None
+
+        return os.path.join(self.folder, name)
+
+    def getFiles(self, release):
+        if os.path.isdir(release):
+            return [os.path.join(root, name) for root, dirs, names in os.walk(release) for name in names]
+
+        return [release]
+
+    def isComplete(self, files):
+        for file in files:
+            if os.path.splitext(file)[1][1:].lower() in self.incomplete_extensions:
+                return False
+
+        return True
+
+    def lastModified(self, files):
+        modified = 0
+        for file in files:
+            try:
+                modified = max(modified, os.path.getmtime(file))
+            except OSError:
+                pass
+
+        return modified
+
+
+class InotifyBackend(object):
+
+    def __init__(self, folder):
+        if not libc:
+            raise OSError('no libc')
+
+        self.fd = libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init failed')
+
+        self.wake_read, self.wake_write = os.pipe()
+        self.watches = {}
+        self.folder = folder
+        self.addWatches(folder)
+
+    def addWatches(self, folder):
+        for root, dirs, files in os.walk(folder):
+            wd = libc.inotify_add_watch(self.fd, root, WATCH_MASK)
+            if wd < 0:
+                log.error('Failed watching %s: %s' % (root, os.strerror(ctypes.get_errno())))
+                continue
+            self.watches[wd] = root
+
+    def wait(self, timeout = None):
+        readable = select.select([self.fd, self.wake_read], [], [], timeout)[0]
+        if self.fd not in readable:
+            return []
+
+        data = os.read(self.fd, 65536)
+        paths = []
+
+        position = 0
+        while position + 16 <= len(data):
+            wd, mask, cookie, length = struct.unpack('iIII', data[position:position + 16])
+            name = data[position + 16:position + 16 + length].rstrip('\0')
+            position += 16 + length
+
+            # Too many changes at once, treat everything as changed
+            if mask & IN_Q_OVERFLOW:
+                paths.extend([os.path.join(self.folder, entry) for entry in os.listdir(self.folder)])
+                continue
+
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            folder = self.watches.get(wd)
+            if not folder:
+                continue
+
+            path = os.path.join(folder, name) if name else folder
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self.addWatches(path)
+
+            paths.append(path)
+
+        return paths
+
+    def wake(self):
+        os.write(self.wake_write, '1')
+
+    def close(self):
+        for fd in [self.fd, self.wake_read, self.wake_write]:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class PollBackend(object):
+
+    def __init__(self, folder, poll, stopped):
+        self.folder = folder
+        self.poll = poll
+        self.stopped = stopped
+        self.last = self.snapshot()
+
+    def snapshot(self):
+        ''' Number of files, total size and last modification of every release '''
+
+        releases = {}
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+
+            stats = []
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    for file in files:
+                        try:
+                            stats.append(os.stat(os.path.join(root, file)))
+                        except OSError:
+                            pass
+            else:
+                try:
+                    stats.append(os.stat(path))
+                except OSError:
+                    pass
+
+            releases[path] = (len(stats), sum([s.st_size for s in stats]), max([s.st_mtime for s in stats] or [0]))
+
+        return releases
+
+    def wait(self, timeout = None):
+        self.stopped.wait(self.poll if timeout is None else min(timeout, self.poll))
+        if self.stopped.isSet():
+            return []
+
+        current = self.snapshot()
+        paths = [path for path in set(current) | set(self.last) if current.get(path) != self.last.get(path)]
+        self.last = current
+
+        return paths
+
+    def wake(self):
+        pass
+
+    def close(self):
+        pass
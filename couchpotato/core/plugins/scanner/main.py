@@ -1,21 +1,83 @@
 from couchpotato import get_session
-from couchpotato.core.event import fireEvent, addEvent
+from couchpotato.core.event import EventCache, fireEvent, addEvent
 from couchpotato.core.helpers.encoding import toUnicode, simplifyString
-from couchpotato.core.helpers.variable import getExt
+from couchpotato.core.helpers.variable import getExt, md5, tryInt
 from couchpotato.core.logger import CPLog
 from couchpotato.core.plugins.base import Plugin
-from couchpotato.core.settings.model import File
+from couchpotato.core.plugins.scanner.metadata import MetaDataPool
+from couchpotato.core.plugins.scanner.probe import probe
+from couchpotato.core.settings.model import File, ScannedGroup
 from couchpotato.environment import Env
-from flask.helpers import json
+import bisect
 import os
 import re
-import subprocess
+import stat
 import time
 import traceback
 
+try:
+    from scandir import scandir
+except ImportError:
+    scandir = None
+
 log = CPLog(__name__)
 
 
+class IdentifierIndex(object):
+    ''' Files by their string identifier, to find the files whose identifier
+    contains another one without going through all of them. Identifiers are
+    looked up by one of their words, the matches are checked afterwards. '''
+
+    def __init__(self, identifiers):
+        self.files = {}
+        self.words = {}
+
+        for file, identifier in identifiers.iteritems():
+            self.files.setdefault(identifier, set()).add(file)
+
+        for identifier in self.files:
+            for word in identifier.split():
+                self.words.setdefault(word, set()).add(identifier)
+
+        self.sorted_words = sorted(self.words)
+
+    def candidates(self, identifier):
+        words = identifier.split()
+
+        # Inner words are complete words of the identifiers containing it
+        if len(words) > 2:
+            return self.words.get(min(words[1:-1], key = lambda x: len(self.words.get(x, ()))), ())
+
+        # The last of two words starts a word
+        if len(words) == 2:
+            found = set()
+            i = bisect.bisect_left(self.sorted_words, words[1])
+            while i < len(self.sorted_words) and self.sorted_words[i].startswith(words[1]):
+                found.update(self.words[self.sorted_words[i]])
+                i += 1
+            return found
+
+        # A single word is part of a word
+        if len(words) == 1:
+            found = set()
+            for word in self.sorted_words:
+                if words[0] in word:
+                    found.update(self.words[word])
+            return found
+
+        return list(self.files)
+
+    def pop(self, identifier):
+        ''' Remove and return the files whose identifier contains identifier '''
+
+        found = set()
+        for candidate in self.candidates(identifier):
+            if identifier in candidate and candidate in self.files:
+                found.update(self.files.pop(candidate))
+
+        return found
+
+
 class Scanner(Plugin):
 
     minimal_filesize = {
@@ -40,6 +102,12 @@ class Scanner(Plugin):
         'backdrop': ('image', 'backdrop'),
     }
 
+    media_info = {
+        'audio': ('audio stream', 'compression'),
+        'resolution_width': ('video stream', 'image width'),
+        'resolution_height': ('video stream', 'image height'),
+    }
+
     codecs = {
         'audio': ['dts', 'ac3', 'ac3d', 'mp3'],
         'video': ['x264', 'h264', 'divx', 'xvid']
@@ -73,6 +141,18 @@ class Scanner(Plugin):
         addEvent('scanner.create_file_identifier', self.createStringIdentifier)
 
         addEvent('scanner.scan', self.scan)
+        addEvent('scanner.media_info', self.getMediaInfo)
+
+        # Long running getmeta.py workers, so not every file starts a new interpreter
+        lib_dir = os.path.join(Env.get('app_dir'), 'libs')
+        self.meta_pool = MetaDataPool(os.path.join(lib_dir, 'getmeta.py'), lib_dir)
+
+        # Media info of files that aren't in the database (yet), by fingerprint
+        self.media_info_cache = EventCache(timeout = 0, max = 1000)
+
+    def doShutdown(self):
+        super(Scanner, self).doShutdown()
+        self.meta_pool.stop()
 
     def scanLibrary(self):
 
@@ -110,46 +190,52 @@ class Scanner(Plugin):
             [db.delete(x) for x in files_in_path]
             db.commit()
 
-        db.remove()
-
-
-    def scan(self, folder = None):
+    def scan(self, folder = None, files = None, min_age = 60):
+        ''' Group the movies in folder. Only look at "files" (folders or files
+        inside folder) when given. Skip groups that changed less then min_age seconds ago. '''
 
         if not folder or not os.path.isdir(folder):
             log.error('Folder doesn\'t exists: %s' % folder)
             return {}
 
+        # Stat every file once, the results are used for the rest of the scan
+        if files is None:
+            file_stats = self.walk(folder)
+        else:
+            file_stats = {}
+            for path in files:
+                if os.path.isdir(path):
+                    file_stats.update(self.walk(path))
+                elif os.path.isfile(path):
+                    file_stats[path] = os.stat(path)
+
         # Get movie "master" files
         movie_files = {}
         leftovers = []
-        for root, dirs, files in os.walk(folder):
-            for filename in files:
-
-                file_path = os.path.join(root, filename)
+        for file_path in file_stats:
 
-                # Remove ignored files
-                if not self.keepFile(file_path):
-                    continue
+            # Remove ignored files
+            if not self.keepFile(file_path, file_stats):
+                continue
 
-                is_dvd_file = self.isDVDFile(file_path)
-                if os.path.getsize(file_path) > self.minimal_filesize['media'] or is_dvd_file: # Minimal 300MB files or is DVD file
+            is_dvd_file = self.isDVDFile(file_path)
+            if file_stats[file_path].st_size > self.minimal_filesize['media'] or is_dvd_file: # Minimal 300MB files or is DVD file
 
-                    identifier = self.createStringIdentifier(file_path, folder, exclude_filename = is_dvd_file)
+                identifier = self.createStringIdentifier(file_path, folder, exclude_filename = is_dvd_file)
 
-                    if not movie_files.get(identifier):
-                        movie_files[identifier] = {
-                            'unsorted_files': [],
-                            'identifiers': [],
-                            'is_dvd': is_dvd_file,
-                        }
+                if not movie_files.get(identifier):
+                    movie_files[identifier] = {
+                        'unsorted_files': [],
+                        'identifiers': [],
+                        'is_dvd': is_dvd_file,
+                    }
 
-                    movie_files[identifier]['unsorted_files'].append(file_path)
-                else:
-                    leftovers.append(file_path)
+                movie_files[identifier]['unsorted_files'].append(file_path)
+            else:
+                leftovers.append(file_path)
 
-        # Sort reverse, this prevents "Iron man 2" from getting grouped with "Iron man" as the "Iron Man 2"
-        # files will be grouped first.
-        leftovers = set(sorted(leftovers, reverse = True))
+        # Create the identifier of every leftover file once
+        leftovers = IdentifierIndex(dict([(file, self.createStringIdentifier(file, folder)) for file in leftovers]))
 
         id_handles = [
             None, # Attach files to group by identifier
@@ -163,13 +249,10 @@ class Scanner(Plugin):
                 identifier = handler(identifier) if handler else identifier
                 if identifier not in group['identifiers'] and len(identifier) > 0: group['identifiers'].append(identifier)
 
-                # Group the files based on the identifier
-                found_files = self.getGroupFiles(identifier, folder, leftovers)
+                # Group the files based on the identifier, found files are removed from the leftovers
+                found_files = self.getGroupFiles(identifier, leftovers)
                 group['unsorted_files'].extend(found_files)
 
-                # Remove the found files from the leftover stack
-                leftovers = leftovers - found_files
-
 
         # Determine file types
         delete_identifier = []
@@ -179,7 +262,7 @@ class Scanner(Plugin):
             # Check if movie is fresh and maybe still unpacking, ignore files new then 1 minute
             file_too_new = False
             for file in group['unsorted_files']:
-                if os.path.getmtime(file) > time.time() - 60:
+                if file_stats[file].st_mtime > time.time() - min_age:
                     file_too_new = True
 
             if file_too_new:
@@ -187,13 +270,19 @@ class Scanner(Plugin):
                 delete_identifier.append(identifier)
                 continue
 
+            # Use the last result if none of the files changed
+            fingerprint = self.getFingerprint(group['unsorted_files'], file_stats)
+            if self.loadGroup(fingerprint, group, folder):
+                log.debug('Group didn\'t change since the last scan: %s' % identifier)
+                continue
+
             # Group extra (and easy) files first
-            images = self.getImages(group['unsorted_files'])
+            images = self.getImages(group['unsorted_files'], file_stats)
             group['files'] = {
                 'subtitle': self.getSubtitles(group['unsorted_files']),
                 'subtitle_extra': self.getSubtitlesExtras(group['unsorted_files']),
                 'nfo': self.getNfo(group['unsorted_files']),
-                'trailer': self.getTrailers(group['unsorted_files']),
+                'trailer': self.getTrailers(group['unsorted_files'], file_stats),
                 'backdrop': images['backdrop'],
                 'leftover': set(group['unsorted_files']),
             }
@@ -202,24 +291,11 @@ class Scanner(Plugin):
             if group['is_dvd']:
                 group['files']['movie'] = self.getDVDFiles(group['unsorted_files'])
             else:
-                group['files']['movie'] = self.getMediaFiles(group['unsorted_files'])
-            group['meta_data'] = self.getMetaData(group)
+                group['files']['movie'] = self.getMediaFiles(group['unsorted_files'], file_stats)
+            group['meta_data'] = self.getMetaData(group, file_stats)
 
             # Get parent dir from movie files
-            for movie_file in group['files']['movie']:
-                group['parentdir'] = os.path.dirname(movie_file)
-                group['dirname'] = None
-
-                folder_names = group['parentdir'].replace(folder, '').split(os.path.sep)
-                folder_names.reverse()
-
-                # Try and get a proper dirname, so no "A", "Movie", "Download" etc
-                for folder_name in folder_names:
-                    if folder_name.lower() not in self.ignore_names and len(folder_name) > 2:
-                        group['dirname'] = folder_name
-                        break
-
-                break
+            self.setDirname(group, folder)
 
             # Leftover "sorted" files
             for type in group['files']:
@@ -232,34 +308,172 @@ class Scanner(Plugin):
             group['library'] = self.determineMovie(group)
             if not group['library']:
                 log.error('Unable to determin movie: %s' % group['identifiers'])
+            else:
+                self.saveGroup(fingerprint, group)
 
         # Delete still (asuming) unpacking files
         for identifier in delete_identifier:
             del movie_files[identifier]
 
+        self.cleanGroups()
+
         return movie_files
 
-    def getMetaData(self, group):
+    def walk(self, folder):
+        ''' All files below folder with their stat result. Every entry is stat'ed
+        once, symlinks to folders aren't followed, like os.walk. '''
+
+        file_stats = {}
+        folders = [folder]
+        while folders:
+            current = folders.pop()
+
+            try:
+                if scandir:
+                    entries = [(entry.path, entry) for entry in scandir(current)]
+                else:
+                    entries = [(os.path.join(current, name), None) for name in os.listdir(current)]
+            except OSError:
+                log.error('Couldn\'t list folder: %s' % current)
+                continue
+
+            for path, entry in entries:
+                try:
+                    if entry:
+                        if entry.is_dir(follow_symlinks = False):
+                            folders.append(path)
+                        elif entry.is_file():
+                            file_stats[path] = entry.stat()
+                        continue
+
+                    path_stat = os.lstat(path)
+                    if stat.S_ISLNK(path_stat.st_mode):
+                        path_stat = os.stat(path)
+                        if stat.S_ISDIR(path_stat.st_mode):
+                            continue
+
+                    if stat.S_ISDIR(path_stat.st_mode):
+                        folders.append(path)
+                    elif stat.S_ISREG(path_stat.st_mode):
+                        file_stats[path] = path_stat
+                except OSError:
+                    log.debug('Couldn\'t stat: %s' % path)
+
+        return file_stats
+
+    def setDirname(self, group, folder):
+
+        for movie_file in group['files']['movie']:
+            group['parentdir'] = os.path.dirname(movie_file)
+            group['dirname'] = None
+
+            folder_names = group['parentdir'].replace(folder, '').split(os.path.sep)
+            folder_names.reverse()
+
+            # Try and get a proper dirname, so no "A", "Movie", "Download" etc
+            for folder_name in folder_names:
+                if folder_name.lower() not in self.ignore_names and len(folder_name) > 2:
+                    group['dirname'] = folder_name
+                    break
+
+            break
+
+    def getFingerprint(self, files, file_stats):
+
+        group_stats = []
+        for file in sorted(files):
+            file_stat = file_stats[file]
+            group_stats.append([toUnicode(file), file_stat.st_size, int(file_stat.st_mtime), file_stat.st_ino])
+
+        return md5(repr(group_stats))
+
+    def loadGroup(self, fingerprint, group, folder):
+
+        if not fingerprint:
+            return False
+
+        db = get_session()
+        scanned = db.query(ScannedGroup).filter_by(fingerprint = fingerprint).first()
+        if not scanned or not scanned.result:
+            return False
+
+        result = scanned.result
+
+        library = fireEvent('library.add', attrs = {
+            'identifier': result['identifier']
+        }, update_after = False, single = True)
+        if not library:
+            return False
+
+        # Same fingerprint means the same paths, use the ones from this scan
+        paths = dict([(toUnicode(file), file) for file in group['unsorted_files']])
+
+        group['library'] = library
+        group['identifiers'] = result['identifiers']
+        group['meta_data'] = result['meta_data']
+        group['files'] = dict([(type, set([paths[file] for file in files if file in paths])) for type, files in result['files'].iteritems()])
+        self.setDirname(group, folder)
+        del group['unsorted_files']
+
+        # Don't write on every scan, a day is precise enough for cleaning up
+        if scanned.last_seen < time.time() - 86400:
+            scanned.last_seen = int(time.time())
+            db.commit()
+
+        return True
+
+    def saveGroup(self, fingerprint, group):
+
+        if not fingerprint:
+            return
+
+        db = get_session()
+        scanned = db.query(ScannedGroup).filter_by(fingerprint = fingerprint).first()
+        if not scanned:
+            scanned = ScannedGroup(fingerprint = fingerprint)
+            db.add(scanned)
+
+        scanned.last_seen = int(time.time())
+        scanned.result = {
+            'identifier': group['library']['identifier'],
+            'identifiers': group['identifiers'],
+            'meta_data': group['meta_data'],
+            'files': dict([(type, [toUnicode(file) for file in files]) for type, files in group['files'].iteritems()]),
+        }
+
+        try:
+            db.commit()
+        except:
+            log.error('Failed saving scan result: %s' % traceback.format_exc())
+            db.rollback()
+
+    def cleanGroups(self, days = 30):
+
+        db = get_session()
+        db.query(ScannedGroup).filter(ScannedGroup.last_seen < time.time() - (days * 86400)).delete(synchronize_session = False)
+        db.commit()
+
+    def getMetaData(self, group, file_stats = {}):
 
         data = {}
         files = list(group['files']['movie'])
 
-        for file in files:
-            if os.path.getsize(file) < self.minimal_filesize['media']: continue # Ignore smaller files
+        # Ignore smaller files, parse the others in one go
+        media_files = [file for file in files if self.getSize(file, file_stats) >= self.minimal_filesize['media']]
+        media_info = self.getMediaInfos(media_files, file_stats)
 
-            meta = self.getMeta(file)
+        for file in media_files:
+            meta = media_info[file]
 
-            try:
-                data['video'] = self.getCodec(file, self.codecs['video'])
-                data['audio'] = meta['audio stream'][0]['compression']
-                data['resolution_width'] = meta['video stream'][0]['image width']
-                data['resolution_height'] = meta['video stream'][0]['image height']
-            except:
-                pass
+            data['video'] = self.getCodec(file, self.codecs['video'])
+            for key in self.media_info:
+                if meta.get(key):
+                    data[key] = meta[key]
 
             if data.get('audio'): break
 
-        data['quality'] = fireEvent('quality.guess', files = files, extra = data, single = True)
+        sizes = dict([(file, self.getSize(file, file_stats)) for file in files])
+        data['quality'] = fireEvent('quality.guess', files = files, extra = data, sizes = sizes, single = True)
         if not data['quality']:
             data['quality'] = fireEvent('quality.single', 'dvdr' if group['is_dvd'] else 'dvdrip', single = True)
 
@@ -271,18 +485,72 @@ class Scanner(Plugin):
 
         return data
 
-    def getMeta(self, filename):
-        lib_dir = os.path.join(Env.get('app_dir'), 'libs')
-        script = os.path.join(lib_dir, 'getmeta.py')
+    def getMediaInfo(self, file, file_stats = {}):
+        return self.getMediaInfos([file], file_stats)[file]
+
+    def getMediaInfos(self, files, file_stats = {}):
+        ''' Audio codec and resolution of media files. Stored as file properties
+        when the file gets added to a release, so every version of a file only
+        gets parsed once, even after it's been moved. Files that are only scanned,
+        like the ones still in the download folder, are kept in memory.
+        Most files only need their headers read, the rest are handed to a
+        single getmeta.py worker together. '''
+
+        infos = {}
+        fingerprints = {}
+        metas = {}
+        for file in files:
+            try:
+                fingerprints[file] = self.getFileFingerprint(file, file_stats)
+            except:
+                log.error('Failed getting fingerprint of %s: %s' % (file, traceback.format_exc()))
+                fingerprints[file] = None
+
+            if fingerprints[file]:
+                found, cached = self.media_info_cache.get(fingerprints[file])
+                if not found:
+                    cached = fireEvent('file.properties', 'media_fingerprint', fingerprints[file], single = True)
+                if cached is not None:
+                    infos[file] = dict([(key, tryInt(value)) for key, value in cached.iteritems() if value])
+                    continue
 
-        p = subprocess.Popen(["python", script, filename], stdout = subprocess.PIPE, stderr = subprocess.PIPE, cwd = lib_dir)
-        z = p.communicate()[0]
+            metas[file] = probe(file)
 
+        hachoir = [file for file, meta in metas.iteritems() if not meta]
+        if hachoir:
+            metas.update(self.meta_pool.getMany(hachoir))
+
+        for file, meta in metas.iteritems():
+            info = {}
+            for key, (stream, field) in self.media_info.iteritems():
+                try:
+                    info[key] = meta[stream][0][field]
+                except:
+                    pass
+
+            if fingerprints[file]:
+                info['media_fingerprint'] = fingerprints[file]
+                self.media_info_cache.set(fingerprints[file], dict(info))
+
+            infos[file] = info
+
+        return infos
+
+    def getFileFingerprint(self, file, file_stats = {}, chunk_size = 65536):
+        ''' Size, modification time and a hash of the first and last part of the file '''
+
+        stats = file_stats.get(file) or os.stat(file)
+
+        f = open(file, 'rb')
         try:
-            meta = json.loads(z)
-            return meta
-        except Exception:
-            log.error('Couldn\'t get metadata from file: %s' % traceback.format_exc())
+            data = f.read(chunk_size)
+            if stats.st_size > chunk_size * 2:
+                f.seek(-chunk_size, os.SEEK_END)
+                data += f.read(chunk_size)
+        finally:
+            f.close()
+
+        return '%s-%s-%s' % (stats.st_size, int(stats.st_mtime), md5(data))
 
     def determineMovie(self, group):
         imdb_id = None
@@ -313,7 +581,6 @@ class Scanner(Plugin):
                     break
                 except:
                     pass
-            db.remove()
 
         # Search based on OpenSubtitleHash
         if not imdb_id and not group['is_dvd']:
@@ -375,10 +642,10 @@ class Scanner(Plugin):
 
         return False
 
-    def getMediaFiles(self, files):
+    def getMediaFiles(self, files, file_stats = {}):
 
         def test(s):
-            return self.filesizeBetween(s, 300, 100000) and getExt(s.lower()) in self.extensions['movie']
+            return self.filesizeBetween(s, 300, 100000, file_stats) and getExt(s.lower()) in self.extensions['movie']
 
         return set(filter(test, files))
 
@@ -397,14 +664,14 @@ class Scanner(Plugin):
     def getNfo(self, files):
         return set(filter(lambda s: getExt(s.lower()) in self.extensions['nfo'], files))
 
-    def getTrailers(self, files):
+    def getTrailers(self, files, file_stats = {}):
 
         def test(s):
-            return re.search('(^|[\W_])trailer\d*[\W_]', s.lower()) and self.filesizeBetween(s, 2, 250)
+            return re.search('(^|[\W_])trailer\d*[\W_]', s.lower()) and self.filesizeBetween(s, 2, 250, file_stats)
 
         return set(filter(test, files))
 
-    def getImages(self, files):
+    def getImages(self, files, file_stats = {}):
 
         def test(s):
             return getExt(s.lower()) in ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'tbn']
@@ -413,7 +680,7 @@ class Scanner(Plugin):
         images = {}
 
         # Fanart
-        images['backdrop'] = set(filter(lambda s: re.search('(^|[\W_])fanart|backdrop\d*[\W_]', s.lower()) and self.filesizeBetween(s, 0, 5), files))
+        images['backdrop'] = set(filter(lambda s: re.search('(^|[\W_])fanart|backdrop\d*[\W_]', s.lower()) and self.filesizeBetween(s, 0, 5, file_stats), files))
 
         # Rest
         images['rest'] = files - images['backdrop']
@@ -432,7 +699,7 @@ class Scanner(Plugin):
 
         return False
 
-    def keepFile(self, file):
+    def keepFile(self, file, file_stats = {}):
 
         # ignoredpaths
         for i in self.ignored_in_path:
@@ -446,7 +713,7 @@ class Scanner(Plugin):
             return False
 
         # Minimal size
-        if self.filesizeBetween(file, self.minimal_filesize['media']):
+        if self.filesizeBetween(file, self.minimal_filesize['media'], file_stats = file_stats):
             log.debug('File to small: %s' % file)
             return False
 
@@ -454,16 +721,20 @@ class Scanner(Plugin):
         return True
 
 
-    def filesizeBetween(self, file, min = 0, max = 100000):
+    def filesizeBetween(self, file, min = 0, max = 100000, file_stats = {}):
         try:
-            return (min * 1048576) < os.path.getsize(file) < (max * 1048576)
+            return (min * 1048576) < self.getSize(file, file_stats) < (max * 1048576)
         except:
             log.error('Couldn\'t get filesize of %s.' % file)
 
         return False
 
-    def getGroupFiles(self, identifier, folder, file_pile):
-        return set(filter(lambda s:identifier in self.createStringIdentifier(s, folder), file_pile))
+    def getSize(self, file, file_stats = {}):
+        file_stat = file_stats.get(file)
+        return file_stat.st_size if file_stat else os.path.getsize(file)
+
+    def getGroupFiles(self, identifier, leftovers):
+        return leftovers.pop(identifier)
 
     def createStringIdentifier(self, file_path, folder = '', exclude_filename = False):
 
@@ -0,0 +1,132 @@
+from __future__ import with_statement
+from couchpotato.core.logger import CPLog
+from flask.helpers import json
+import Queue
+import os
+import subprocess
+import sys
+import threading
+
+log = CPLog(__name__)
+
+
+class MetaDataWorker(object):
+    ''' A getmeta.py process that stays running and parses one file per request '''
+
+    def __init__(self, script, cwd):
+        self.process = subprocess.Popen([sys.executable, script, '--worker'],
+                                        stdin = subprocess.PIPE, stdout = subprocess.PIPE, stderr = open(os.devnull, 'w'),
+                                        cwd = cwd, close_fds = os.name != 'nt')
+        self.results = Queue.Queue()
+
+        reader = threading.Thread(target = self.read)
+        reader.daemon = True
+        reader.start()
+
+    def read(self):
+        for line in iter(self.process.stdout.readline, ''):
+            self.results.put(line)
+        self.results.put(None)
+
+    def get(self, filename, timeout = 60):
+        if isinstance(filename, unicode):
+            filename = filename.encode(sys.getfilesystemencoding() or 'utf-8')
+
+        # Latin-1 maps every byte to a character, so any path survives the JSON round trip
+        self.process.stdin.write(json.dumps(filename.decode('latin-1')) + '\n')
+        self.process.stdin.flush()
+
+        line = self.results.get(timeout = timeout)
+        if line is None:
+            raise IOError('Metadata worker stopped')
+
+        return json.loads(line)
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def stop(self):
+        try:
+            self.process.kill()
+            self.process.wait()
+        except:
+            pass
+
+
+class MetaDataPool(object):
+    ''' At most "workers" running getmeta.py processes, started when needed.
+    A worker that doesn't answer within the timeout is killed and replaced. '''
+
+    def __init__(self, script, cwd, workers = 2, timeout = 60):
+        self.script = script
+        self.cwd = cwd
+        self.timeout = timeout
+        self.idle = Queue.Queue()
+        self.slots = threading.Semaphore(workers)
+        self.workers = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        self.slots.acquire()
+        try:
+            worker = self.idle.get_nowait()
+            if worker.alive():
+                return worker
+            self.remove(worker)
+        except Queue.Empty:
+            pass
+
+        try:
+            return self.start()
+        except:
+            self.slots.release()
+            raise
+
+    def start(self):
+        worker = MetaDataWorker(self.script, self.cwd)
+        with self.lock:
+            self.workers.append(worker)
+
+        return worker
+
+    def release(self, worker):
+        self.idle.put(worker)
+        self.slots.release()
+
+    def remove(self, worker):
+        worker.stop()
+        with self.lock:
+            if worker in self.workers:
+                self.workers.remove(worker)
+
+    def getMany(self, filenames):
+        ''' Parse the files one after the other on a single worker, returns a dict by filename '''
+
+        results = {}
+        worker = self.acquire()
+        try:
+            for filename in filenames:
+                try:
+                    results[filename] = worker.get(filename, timeout = self.timeout)
+                except Queue.Empty:
+                    log.error('Getting metadata took longer then %s seconds: %s' % (self.timeout, filename))
+                    results[filename] = None
+                    self.remove(worker)
+                    worker = self.start()
+                except Exception, e:
+                    log.error('Couldn\'t get metadata from file %s: %s' % (filename, e))
+                    results[filename] = None
+                    if not worker.alive():
+                        self.remove(worker)
+                        worker = self.start()
+        finally:
+            self.release(worker)
+
+        return results
+
+    def stop(self):
+        with self.lock:
+            workers, self.workers = self.workers, []
+
+        for worker in workers:
+            worker.stop()
@@ -0,0 +1,394 @@
+''' Read the codecs, resolution and duration of a MKV, MP4 or AVI file from
+its headers only, with a few seeks and small reads. The result has the same
+layout as the output of getmeta.py, None means the file should be parsed by
+hachoir instead. '''
+
+from couchpotato.core.logger import CPLog
+from cStringIO import StringIO
+import datetime
+import os
+import struct
+
+log = CPLog(__name__)
+
+codecs = {
+    # Matroska codec ids
+    'V_MPEG4/ISO/AVC': 'AVC',
+    'V_MS/VFW/FOURCC': 'vfw',
+    'A_AC3': 'AC3',
+    'A_EAC3': 'AC3',
+    'A_DTS': 'DTS',
+    'A_AAC': 'AAC',
+    'A_TRUEHD': 'TRUEHD',
+    'A_MPEG/L3': 'mp3',
+    'A_VORBIS': 'vorbis',
+    'A_PCM': 'PCM',
+    'S_TEXT/ASCII': 'ASCII',
+    'S_TEXT/UTF8': 'UTF8',
+    'S_TEXT/SSA': 'SSA',
+    'S_TEXT/ASS': 'ASS',
+
+    # MP4 and AVI fourccs
+    'AVC1': 'AVC',
+    'AVC3': 'AVC',
+    'H264': 'AVC',
+    'X264': 'AVC',
+    'XVID': 'xvid',
+    'DIVX': 'divx',
+    'DX50': 'divx',
+    'DIV3': 'divx',
+    'WVC1': 'WVC1',
+    'MP4A': 'AAC',
+    'AC-3': 'AC3',
+    'EC-3': 'AC3',
+    'DTSC': 'DTS',
+    'DTSH': 'DTS',
+    'DTSL': 'DTS',
+
+    # AVI audio format tags
+    0x0001: 'PCM',
+    0x0050: 'MPEG',
+    0x0055: 'mp3',
+    0x00FF: 'AAC',
+    0x0161: 'WMA',
+    0x0162: 'WMA',
+    0x1610: 'AAC',
+    0x2000: 'AC3',
+    0x2001: 'DTS',
+}
+
+def probe(filename):
+
+    try:
+        f = open(filename, 'rb')
+    except IOError:
+        return None
+
+    try:
+        try:
+            head = f.read(12)
+            if head[:4] == '\x1a\x45\xdf\xa3':
+                meta = probeMatroska(f)
+            elif head[4:8] == 'ftyp':
+                meta = probeMp4(f)
+            elif head[:4] == 'RIFF' and head[8:12] == 'AVI ':
+                meta = probeAvi(f)
+            else:
+                return None
+        except:
+            log.debug('Failed probing %s, falling back to full parse' % filename)
+            return None
+    finally:
+        f.close()
+
+    # Only usable if the header had all we need
+    if not meta or not meta.get('video stream') or not meta['video stream'][0].get('image width'):
+        return None
+
+    return meta
+
+def getCodec(codec):
+    if isinstance(codec, basestring):
+        codec = codec.strip('\x00 ')
+        for prefix in ['A_AAC', 'A_PCM', 'A_DTS']:
+            if codec.startswith(prefix):
+                return codecs[prefix]
+        return codecs.get(codec.upper(), codec)
+
+    return codecs.get(codec, '0x%04x' % codec)
+
+def addStream(meta, section, **values):
+    stream = dict([(key.replace('_', ' '), value) for key, value in values.iteritems() if value is not None])
+    meta.setdefault(section, []).append(stream)
+
+def setDuration(meta, seconds):
+    if seconds:
+        meta['common'] = [{'duration': str(datetime.timedelta(seconds = int(round(seconds))))}]
+
+
+# Matroska
+def readVint(f, keep_marker = False):
+    first = f.read(1)
+    if not first:
+        raise EOFError()
+
+    first = ord(first)
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8:
+        raise ValueError('Invalid EBML number')
+
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in f.read(length - 1):
+        value = (value << 8) | ord(byte)
+
+    return value, length
+
+def readElements(data):
+    ''' (id, data) of every element in a buffer '''
+
+    f = StringIO(data)
+
+    while f.tell() < len(data):
+        element_id, _ = readVint(f, keep_marker = True)
+        size, _ = readVint(f)
+        yield element_id, f.read(size)
+
+def readUInt(data):
+    value = 0
+    for byte in data:
+        value = (value << 8) | ord(byte)
+    return value
+
+def readFloat(data):
+    return struct.unpack('>f' if len(data) == 4 else '>d', data)[0]
+
+MKV_SEGMENT = 0x18538067
+MKV_SEEKHEAD = 0x114D9B74
+MKV_INFO = 0x1549A966
+MKV_TRACKS = 0x1654AE6B
+MKV_CLUSTER = 0x1F43B675
+
+def probeMatroska(f, max_element = 1048576):
+
+    f.seek(0)
+    element_id, _ = readVint(f, keep_marker = True)
+    size, _ = readVint(f)
+    f.seek(size, os.SEEK_CUR)
+
+    element_id, _ = readVint(f, keep_marker = True)
+    if element_id != MKV_SEGMENT:
+        return None
+    readVint(f)
+    segment_start = f.tell()
+
+    wanted = {MKV_INFO: None, MKV_TRACKS: None}
+    seek_positions = {}
+    position = segment_start
+    while None in wanted.values():
+        f.seek(position)
+        try:
+            element_id, _ = readVint(f, keep_marker = True)
+            size, size_length = readVint(f)
+        except EOFError:
+            break
+        data_start = f.tell()
+
+        if element_id in wanted or element_id == MKV_SEEKHEAD:
+            if size > max_element:
+                break
+
+            data = f.read(size)
+            if element_id == MKV_SEEKHEAD:
+                seek_positions.update(parseSeekHead(data))
+            else:
+                wanted[element_id] = data
+
+        # The clusters hold the actual video, jump over them to the missing headers
+        elif element_id == MKV_CLUSTER or size == (1 << (7 * size_length)) - 1:
+            missing = [segment_start + seek_positions[x] for x in wanted if wanted[x] is None and x in seek_positions]
+            missing = [x for x in missing if x > position]
+            if not missing:
+                break
+
+            position = min(missing)
+            continue
+
+        position = data_start + size
+
+    if not wanted[MKV_TRACKS]:
+        return None
+
+    meta = {}
+
+    timecode_scale = 1000000
+    duration = None
+    for element_id, data in readElements(wanted[MKV_INFO] or ''):
+        if element_id == 0x2AD7B1:
+            timecode_scale = readUInt(data)
+        elif element_id == 0x4489:
+            duration = readFloat(data)
+    if duration:
+        setDuration(meta, duration * timecode_scale / 1000000000.0)
+
+    for element_id, data in readElements(wanted[MKV_TRACKS]):
+        if element_id == 0xAE:
+            parseTrackEntry(meta, data)
+
+    return meta
+
+def parseSeekHead(data):
+    positions = {}
+    for element_id, seek in readElements(data):
+        if element_id != 0x4DBB:
+            continue
+
+        seek_id = position = None
+        for child_id, value in readElements(seek):
+            if child_id == 0x53AB:
+                seek_id = readUInt(value)
+            elif child_id == 0x53AC:
+                position = readUInt(value)
+
+        if seek_id and position is not None:
+            positions[seek_id] = position
+
+    return positions
+
+def parseTrackEntry(meta, data):
+    track_type = codec = None
+    video = audio = {}
+
+    for element_id, value in readElements(data):
+        if element_id == 0x83:
+            track_type = readUInt(value)
+        elif element_id == 0x86:
+            codec = getCodec(value)
+        elif element_id == 0xE0:
+            video = dict(readElements(value))
+        elif element_id == 0xE1:
+            audio = dict(readElements(value))
+
+    if track_type == 1:
+        addStream(meta, 'video stream', compression = codec,
+                  image_width = readUInt(video[0xB0]) if 0xB0 in video else None,
+                  image_height = readUInt(video[0xBA]) if 0xBA in video else None)
+    elif track_type == 2:
+        addStream(meta, 'audio stream', compression = codec,
+                  channel = readUInt(audio[0x9F]) if 0x9F in audio else 1,
+                  sample_rate = readFloat(audio[0xB5]) if 0xB5 in audio else 8000.0)
+    elif track_type == 0x11:
+        addStream(meta, 'subtitle', compression = codec)
+
+
+# MP4
+mp4_containers = ['moov', 'trak', 'mdia', 'minf', 'stbl']
+
+def readBoxes(f, start, end):
+    ''' (type, data start, data end) of the boxes in a part of the file '''
+
+    position = start
+    while position + 8 <= end:
+        f.seek(position)
+        header = f.read(8)
+        if len(header) < 8:
+            break
+
+        size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - position
+
+        if size < header_size:
+            break
+
+        yield box_type, position + header_size, min(position + size, end)
+        position += size
+
+def probeMp4(f):
+
+    f.seek(0, os.SEEK_END)
+    file_size = f.tell()
+
+    meta = {}
+    for box_type, start, end in readBoxes(f, 0, file_size):
+        if box_type == 'moov':
+            parseMp4Box(f, meta, start, end, {})
+            return meta
+
+    return None
+
+def parseMp4Box(f, meta, start, end, track):
+
+    for box_type, box_start, box_end in readBoxes(f, start, end):
+        f.seek(box_start)
+
+        if box_type in mp4_containers:
+            if box_type == 'trak':
+                track = {}
+            parseMp4Box(f, meta, box_start, box_end, track)
+
+            if box_type == 'trak' and track.get('handler') == 'vide':
+                addStream(meta, 'video stream', compression = track.get('codec'),
+                          image_width = track.get('width'), image_height = track.get('height'))
+            elif box_type == 'trak' and track.get('handler') == 'soun':
+                addStream(meta, 'audio stream', compression = track.get('codec'),
+                          channel = track.get('channels'), sample_rate = track.get('sample_rate'))
+
+        elif box_type == 'mvhd':
+            data = f.read(32)
+            if ord(data[0]) == 1:
+                timescale, duration = struct.unpack('>IQ', data[20:32])
+            else:
+                timescale, duration = struct.unpack('>II', data[12:20])
+            if timescale:
+                setDuration(meta, float(duration) / timescale)
+
+        elif box_type == 'hdlr':
+            track['handler'] = f.read(12)[8:12]
+
+        elif box_type == 'stsd':
+            data = f.read(8 + 36)
+            track['codec'] = getCodec(data[12:16])
+            if track.get('handler') == 'vide':
+                track['width'], track['height'] = struct.unpack('>HH', data[40:44])
+            elif track.get('handler') == 'soun':
+                track['channels'] = struct.unpack('>H', data[32:34])[0]
+                track['sample_rate'] = float(struct.unpack('>H', data[40:42])[0])
+
+
+# AVI
+def probeAvi(f, max_header = 1048576):
+
+    f.seek(12)
+    header = f.read(12)
+    if header[:4] != 'LIST' or header[8:12] != 'hdrl':
+        return None
+
+    size = struct.unpack('<I', header[4:8])[0]
+    if size > max_header:
+        return None
+
+    meta = {}
+    data = f.read(size - 4)
+
+    position = 0
+    stream_type = None
+    micro_sec_per_frame = 0
+    while position + 8 <= len(data):
+        chunk, chunk_size = struct.unpack('<4sI', data[position:position + 8])
+        body = data[position + 8:position + 8 + chunk_size]
+
+        if chunk == 'avih' and len(body) >= 40:
+            micro_sec_per_frame, total_frames = struct.unpack('<I12xI', body[:20])
+            setDuration(meta, total_frames * micro_sec_per_frame / 1000000.0)
+
+        # Frame count of the whole file, avih only counts the first RIFF part of OpenDML files
+        elif chunk == 'dmlh' and len(body) >= 4:
+            setDuration(meta, struct.unpack('<I', body[:4])[0] * micro_sec_per_frame / 1000000.0)
+
+        elif chunk == 'LIST':
+            # Look inside the stream lists, they hold strh and strf
+            position += 12
+            continue
+
+        elif chunk == 'strh':
+            stream_type = body[:4]
+
+        elif chunk == 'strf' and stream_type == 'vids' and len(body) >= 20:
+            width, height, compression = struct.unpack('<4xii4x4s', body[:20])
+            addStream(meta, 'video stream', compression = getCodec(compression),
+                      image_width = width, image_height = abs(height))
+
+        elif chunk == 'strf' and stream_type == 'auds' and len(body) >= 8:
+            format_tag, channels, sample_rate = struct.unpack('<HHI', body[:8])
+            addStream(meta, 'audio stream', compression = getCodec(format_tag),
+                      channel = channels, sample_rate = float(sample_rate))
+
+        position += 8 + chunk_size + (chunk_size % 2)
+
+    return meta
@@ -30,6 +30,15 @@ config = [{
                     'label': 'Ignored words',
                     'default': 'german, dutch, french, danish, swedish, dubbed, swesub, korsub',
                 },
+                {
+                    'name': 'search_timeout',
+                    'label': 'Search timeout',
+                    'advanced': True,
+                    'default': 20,
+                    'type': 'int',
+                    'unit': 'sec',
+                    'description': 'Use the results of the providers that answered within this time.',
+                },
             ],
         }, {
             'tab': 'searcher',
@@ -1,14 +1,13 @@
 from couchpotato import get_session
-from couchpotato.core.event import addEvent, fireEvent
+from couchpotato.core.event import addEvent, fireEvent, fireEventFutures, \
+    gatherFutures
 from couchpotato.core.helpers.encoding import simplifyString
 from couchpotato.core.helpers.variable import md5
 from couchpotato.core.logger import CPLog
 from couchpotato.core.plugins.base import Plugin
-from couchpotato.core.settings.model import Movie, Release, ReleaseInfo
+from couchpotato.core.settings.model import Movie, Release, eagerLoad
 from couchpotato.environment import Env
-from sqlalchemy.exc import InterfaceError
 import re
-import traceback
 
 log = CPLog(__name__)
 
@@ -31,18 +30,20 @@ class Searcher(Plugin):
 
         db = get_session()
 
-        movies = db.query(Movie).filter(
+        movie_dict = {
+            'profile': {'types': {'quality': {}}},
+            'releases': {'status': {}, 'quality': {}},
+            'library': {'titles': {}, 'files':{}},
+            'files': {}
+        }
+
+        movies = db.query(Movie).options(*eagerLoad(Movie, movie_dict)).filter(
             Movie.status.has(identifier = 'active')
         ).all()
 
         for movie in movies:
 
-            self.single(movie.to_dict({
-                'profile': {'types': {'quality': {}}},
-                'releases': {'status': {}, 'quality': {}},
-                'library': {'titles': {}, 'files':{}},
-                'files': {}
-            }))
+            self.single(movie.to_dict(movie_dict))
 
             # Break if CP wants to shut down
             if self.shuttingDown():
@@ -66,38 +67,13 @@ class Searcher(Plugin):
             if has_better_quality is 0:
 
                 log.info('Search for %s in %s' % (default_title, type['quality']['label']))
-                results = fireEvent('provider.yarr.search', movie, type['quality'], merge = True)
+                # Give the providers a time budget, so a hanging provider doesn't stall the search
+                searches = fireEventFutures('provider.yarr.search', movie, type['quality'])
+                results = gatherFutures(searches, timeout = self.conf('search_timeout'), merge = True)
                 sorted_results = sorted(results, key = lambda k: k['score'], reverse = True)
 
                 # Add them to this movie releases list
-                for nzb in sorted_results:
-                    db = get_session()
-
-                    rls = db.query(Release).filter_by(identifier = md5(nzb['url'])).first()
-                    if not rls:
-                        rls = Release(
-                            identifier = md5(nzb['url']),
-                            movie_id = movie.get('id'),
-                            quality_id = type.get('quality_id'),
-                            status_id = available_status.get('id')
-                        )
-                        db.add(rls)
-                        db.commit()
-
-                        for info in nzb:
-                            try:
-                                if not isinstance(nzb[info], (str, unicode, int, long)):
-                                    continue
-
-                                rls_info = ReleaseInfo(
-                                    identifier = info,
-                                    value = nzb[info]
-                                )
-                                rls.info.append(rls_info)
-                                db.commit()
-                            except InterfaceError:
-                                log.debug('Couldn\'t add %s to ReleaseInfo: %s' % (info, traceback.format_exc()))
-
+                fireEvent('release.add_results', sorted_results, movie_id = movie.get('id'), quality_id = type.get('quality_id'), status_id = available_status.get('id'))
 
                 for nzb in sorted_results:
                     return self.download(data = nzb, movie = movie)
@@ -21,9 +21,9 @@ class StatusPlugin(Plugin):
     }
 
     def __init__(self):
-        addEvent('status.add', self.add)
-        addEvent('status.get', self.add) # Alias for .add
-        addEvent('status.all', self.all)
+        addEvent('status.add', self.add, memoize = {'timeout': 0, 'freeze': True})
+        addEvent('status.get', self.add, memoize = {'timeout': 0, 'freeze': True}) # Alias for .add
+        addEvent('status.all', self.all, memoize = {'timeout': 0, 'freeze': True})
         addEvent('app.load', self.fill)
 
     def all(self):
@@ -52,6 +52,8 @@ class StatusPlugin(Plugin):
             db.add(s)
             db.commit()
 
+            fireEvent('event.clear_cache', 'status.all')
+
         status_dict = s.to_dict()
 
         return status_dict
@@ -73,3 +75,5 @@ class StatusPlugin(Plugin):
             s.label = label
             db.commit()
 
+        fireEvent('event.clear_cache', 'status.add', 'status.get', 'status.all')
+
@@ -111,8 +111,8 @@ class NZBProvider(YarrProvider):
     def __init__(self):
         super(NZBProvider, self).__init__()
 
-        addEvent('provider.nzb.search', self.search)
-        addEvent('provider.yarr.search', self.search)
+        addEvent('provider.nzb.search', self.search, parallel = True)
+        addEvent('provider.yarr.search', self.search, parallel = True)
 
         addEvent('provider.nzb.feed', self.feed)
 
@@ -1,9 +1,12 @@
 from __future__ import with_statement
 from couchpotato.core.event import addEvent
 from couchpotato.core.helpers.encoding import simplifyString, toUnicode
+from couchpotato.core.helpers.variable import md5
 from couchpotato.core.logger import CPLog
 from couchpotato.core.providers.base import MovieProvider
 from libs.themoviedb import tmdb
+import os
+import traceback
 
 log = CPLog(__name__)
 
@@ -15,9 +18,9 @@ class TheMovieDb(MovieProvider):
     imageUrl = 'http://hwcdn.themoviedb.org'
 
     def __init__(self):
-        addEvent('provider.movie.by_hash', self.byHash)
-        addEvent('provider.movie.search', self.search)
-        addEvent('provider.movie.info', self.getInfo)
+        addEvent('provider.movie.by_hash', self.byHash, parallel = True)
+        addEvent('provider.movie.search', self.search, parallel = True)
+        addEvent('provider.movie.info', self.getInfo, parallel = True)
 
         # Use base wrapper
         tmdb.Config.api_key = self.conf('api_key')
@@ -28,13 +31,19 @@ class TheMovieDb(MovieProvider):
         if self.isDisabled():
             return False
 
-        cache_key = 'tmdb.cache.%s' % simplifyString(file)
+        try:
+            file_hash, file_size = self.getHash(file)
+        except:
+            log.debug('Failed hashing %s: %s' % (file, traceback.format_exc()))
+            return []
+
+        cache_key = 'tmdb.cache.%s.%s' % (file_hash, file_size)
         results = self.getCache(cache_key)
 
         if not results:
             log.debug('Searching for movie by hash: %s' % file)
             try:
-                raw = tmdb.searchByHashingFile(file)
+                raw = tmdb.mediaGetInfo(file_hash, file_size)
 
                 results = []
                 if raw:
@@ -53,6 +62,19 @@ class TheMovieDb(MovieProvider):
 
         return results
 
+    def getHash(self, file):
+        ''' OpenSubtitles hash and size of a file, only hashed again when it changed '''
+
+        stats = os.stat(file)
+        cache_key = 'tmdb.hash.%s' % md5('%s.%s.%s' % (toUnicode(file).encode('utf-8'), stats.st_size, int(stats.st_mtime)))
+
+        file_hash = self.getCache(cache_key)
+        if not file_hash:
+            file_hash = tmdb.opensubtitleHashFile(file)
+            self.setCache(cache_key, file_hash, timeout = 2592000)
+
+        return file_hash, stats.st_size
+
     def search(self, q, limit = 12):
         ''' Find movie by name '''
 
@@ -1,6 +1,6 @@
 from __future__ import with_statement
 from couchpotato.api import addApiView
-from couchpotato.core.event import addEvent
+from couchpotato.core.event import addEvent, fireEvent
 from couchpotato.core.helpers.encoding import isInt
 from couchpotato.core.helpers.request import getParams, jsonified
 from couchpotato.core.helpers.variable import mergeDicts
@@ -123,6 +123,9 @@ class Settings():
         self.set(section, option, value)
         self.save()
 
+        # Let the plugins know, for example to (de)activate themselves
+        fireEvent('setting.save.%s.%s' % (section, option), value)
+
         return jsonified({
             'success': True,
         })
@@ -4,8 +4,12 @@ from elixir.options import options_defaults
 from elixir.relationships import OneToMany, ManyToOne
 from elixir.options import using_options
 from elixir.relationships import ManyToMany
+from sqlalchemy.orm import class_mapper, joinedload, subqueryload
+from sqlalchemy.orm.interfaces import MANYTOONE
+from flask.helpers import json
+from sqlalchemy.schema import Index
 from sqlalchemy.types import Integer, Unicode, UnicodeText, Boolean, Float, \
-    String
+    String, TypeDecorator
 
 options_defaults["shortnames"] = True
 
@@ -17,6 +21,22 @@ options_defaults["shortnames"] = True
 __session__ = None
 
 
+class JsonType(TypeDecorator):
+    """Dict stored as compact JSON text"""
+
+    impl = UnicodeText
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return unicode(json.dumps(value, separators = (',', ':')))
+
+    def process_result_value(self, value, dialect):
+        if not value:
+            return None
+        return json.loads(value)
+
+
 class Movie(Entity):
     """Movie Resource a movie could have multiple releases
     The files belonging to the movie object are global for the whole movie
@@ -35,31 +55,23 @@ class Library(Entity):
     """"""
 
     year = Field(Integer)
-    identifier = Field(String(20))
+    identifier = Field(String(20), index = True)
     rating = Field(Float)
 
     plot = Field(UnicodeText)
     tagline = Field(UnicodeText(255))
 
+    info = Field(JsonType)
+
     status = ManyToOne('Status')
     movies = OneToMany('Movie')
-    titles = OneToMany('LibraryTitle')
+    titles = OneToMany('LibraryTitle', order_by = '-default')
     files = ManyToMany('File')
-    info = OneToMany('LibraryInfo')
 
     def title(self):
         return self.titles[0]['title']
 
 
-class LibraryInfo(Entity):
-    """"""
-
-    identifier = Field(String(50))
-    value = Field(Unicode(255), nullable = False)
-
-    library = ManyToOne('Library')
-
-
 class LibraryTitle(Entity):
     """"""
     using_options(order_by = '-default')
@@ -84,23 +96,14 @@ class Release(Entity):
     """Logically groups all files that belong to a certain release, such as
     parts of a movie, subtitles."""
 
-    identifier = Field(String(100))
+    identifier = Field(String(100), index = True)
+    info = Field(JsonType)
 
     movie = ManyToOne('Movie')
     status = ManyToOne('Status')
     quality = ManyToOne('Quality')
     files = ManyToMany('File')
     history = OneToMany('History')
-    info = OneToMany('ReleaseInfo')
-
-
-class ReleaseInfo(Entity):
-    """Properties that can be bound to a file for off-line usage"""
-
-    identifier = Field(String(50))
-    value = Field(Unicode(255), nullable = False)
-
-    release = ManyToOne('Release')
 
 
 class Status(Entity):
@@ -138,7 +141,7 @@ class Profile(Entity):
     hide = Field(Boolean)
 
     movie = OneToMany('Movie')
-    types = OneToMany('ProfileType', cascade = 'all, delete-orphan')
+    types = OneToMany('ProfileType', cascade = 'all, delete-orphan', order_by = 'order')
 
 
 class ProfileType(Entity):
@@ -182,8 +185,8 @@ class FileType(Entity):
 class FileProperty(Entity):
     """Properties that can be bound to a file for off-line usage"""
 
-    identifier = Field(String(20))
-    value = Field(Unicode(255), nullable = False)
+    identifier = Field(String(20), index = True)
+    value = Field(Unicode(255), nullable = False, index = True)
 
     file = ManyToOne('File')
 
@@ -215,10 +218,80 @@ class Folder(Entity):
     label = Field(Unicode(255))
 
 
+class ScannedGroup(Entity):
+    """Last scan result of a group of files. The fingerprint is made from the
+    path, size, mtime and inode of the files, so changed groups get a new one."""
+
+    fingerprint = Field(String(32), nullable = False, unique = True)
+    result = Field(JsonType)
+    last_seen = Field(Integer)
+
+
+# Lookups that run for every movie, release or file. Each of them should be
+# answered from an index, see checkQueryPlans.
+hot_queries = [
+    'SELECT id FROM library WHERE identifier = ?',
+    'SELECT id FROM librarytitle WHERE libraries_id = ?',
+    'SELECT id FROM movie WHERE library_id = ?',
+    'SELECT id FROM release WHERE identifier = ?',
+    'SELECT id FROM release WHERE movie_id = ?',
+    'SELECT id FROM file WHERE path = ?',
+    'SELECT id FROM fileproperty WHERE file_id = ? AND identifier = ?',
+    'SELECT file_id FROM fileproperty WHERE identifier = ? AND value = ?',
+    'SELECT id FROM status WHERE identifier = ?',
+    'SELECT id FROM quality WHERE identifier = ?',
+    'SELECT id FROM filetype WHERE identifier = ?',
+    'SELECT movie_id FROM movie_files__file_movie WHERE file_id = ?',
+    'SELECT release_id FROM release_files__file_release WHERE file_id = ?',
+    'SELECT library_id FROM library_files__file_library WHERE file_id = ?',
+    'SELECT id FROM scannedgroup WHERE fingerprint = ?',
+]
+
+
+def eagerLoad(entity, deep, path = ''):
+    """Query options that load all relations of a to_dict deep spec up front.
+    Single objects are joined in, lists get one extra query per relation."""
+
+    options = []
+    mapper = class_mapper(entity)
+
+    for name, rdeep in deep.iteritems():
+        prop = mapper.get_property(name)
+        key = path + name
+
+        load = joinedload if prop.direction is MANYTOONE else subqueryload
+        options.append(load(key))
+        options += eagerLoad(prop.mapper.class_, rdeep, key + '.')
+
+    return options
+
+
 def setup():
     """Setup the database and create the tables that don't exists yet"""
-    from elixir import setup_all, create_all
+    from elixir import setup_all, create_all, metadata
     from couchpotato import get_engine
 
     setup_all()
+
+    # The primary key of the ManyToMany tables only covers the first column
+    for table_name in ['movie_files__file_movie', 'release_files__file_release', 'library_files__file_library']:
+        table = metadata.tables[table_name]
+        if not [index for index in table.indexes if index.name == 'ix_%s_file_id' % table_name]:
+            Index('ix_%s_file_id' % table_name, table.c.file_id)
+
     create_all(get_engine())
+
+
+def checkQueryPlans():
+    """Return the hot queries that SQLite would answer with a full table scan"""
+    from couchpotato import get_engine
+
+    failed = {}
+    for query in hot_queries:
+        params = tuple([None] * query.count('?'))
+        plan = get_engine().execute('EXPLAIN QUERY PLAN ' + query, params).fetchall()
+        scans = [row['detail'] for row in plan if row['detail'].startswith('SCAN')]
+        if scans:
+            failed[query] = scans
+
+    return failed
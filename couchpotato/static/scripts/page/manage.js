@@ -10,6 +10,7 @@ Page.Manage = new Class({
 
 		self.list = new MovieList({
 			'status': 'done',
+			'navigation': true,
 			'actions': Manage.Action
 		});
 		$(self.list).inject(self.el);
@@ -11,6 +11,7 @@
 # Source: http://pypi.python.org/pypi/axel
 # Docs:   http://packages.python.org/axel
 
+from collections import deque
 from couchpotato.core.helpers.variable import natcmp
 import Queue
 import sys
@@ -56,21 +57,33 @@ class Event(object):
     """
 
     def __init__(self, sender = None, asynch = False, exc_info = False,
-                 lock = None, threads = 3, traceback = False):
+                 lock = None, threads = 3, traceback = False, pool = None,
+                 parallel = False, async_pool = None):
         """ Creates an event 
         
         asynch
             if True handler's are executes asynchronous
+        async_pool
+            WorkerPool that executes the handlers of asynchronous fires, so
+            long running jobs don't hold the workers synchronous fires need.
+            If None, pool is used
         exc_info
             if True, result will contain sys.exc_info()[:2] on error
         lock
             threading.RLock used to synchronize execution
+        parallel
+            if True, the handlers of a synchronous fire are executed
+            concurrently on the pool. Otherwise they are executed one after
+            the other, in priority order, on the calling thread
+        pool
+            WorkerPool that executes the handlers. If None, a private pool
+            is created for this event
         sender
             event's sender. The sender is passed as the first argument to the 
             handler, only if is not None. For this case the handler must have
             a placeholder in the arguments to receive the sender
         threads
-            maximum number of threads that will be started
+            maximum number of pool workers used by a single fire
         traceback
             if True, the execution result will contain sys.exc_info() 
             on error. exc_info must be also True to get the traceback      
@@ -97,11 +110,17 @@ class Event(object):
         self.asynchronous = asynch
         self.exc_info = exc_info
         self.lock = lock
+        self.parallel = parallel
         self.sender = sender
         self.threads = threads
         self.traceback = traceback
+        self.pool = pool or WorkerPool(threads)
+        self.async_pool = async_pool or self.pool
         self.handlers = {}
         self.memoize = {}
+        self.error_handler = None
+        self._sorted = None
+        self._handlers_lock = threading.Lock()
 
     def handle(self, handler, priority = 0):
         """ Registers a handler. The handler can be transmitted together 
@@ -121,43 +140,93 @@ class Event(object):
             event += {'handler':handler, 'memoize':True, 'timeout':1.5}         
         """
         handler_, memoize, timeout = self._extract(handler)
-        self.handlers['%s.%s' % (priority, hash(handler_))] = (handler_, memoize, timeout)
+
+        # Copy on write, so a running fire isn't affected. Changes are
+        # locked, so concurrent (un)registrations don't undo each other
+        self._handlers_lock.acquire()
+        try:
+            handlers = dict(self.handlers)
+            handlers['%s.%s' % (priority, hash(handler_))] = (handler_, memoize, timeout)
+            self.handlers = handlers
+        finally:
+            self._handlers_lock.release()
         return self
 
     def unhandle(self, handler):
         """ Unregisters a handler """
         handler_, memoize, timeout = self._extract(handler)
-        key = hash(handler_)
-        if not key in self.handlers:
-            raise ValueError('Handler "%s" was not found' % str(handler_))
-        del self.handlers[key]
+
+        self._handlers_lock.acquire()
+        try:
+            keys = [key for key, value in self.handlers.iteritems() if value[0] == handler_]
+            if not keys:
+                raise ValueError('Handler "%s" was not found' % str(handler_))
+
+            handlers = dict(self.handlers)
+            for key in keys:
+                del handlers[key]
+            self.handlers = handlers
+        finally:
+            self._handlers_lock.release()
         return self
 
     def fire(self, *args, **kwargs):
-        """ Stores all registered handlers in a queue for processing """
-        self.queue = Queue.Queue()
-        self.result = []
-
-        if self.handlers:
-            max_threads = self._threads()
-
-            for i in range(max_threads):
-                t = threading.Thread(target = self._execute,
-                                     args = args, kwargs = kwargs)
-                t.daemon = True
-                t.start()
-
-            for handler in sorted(self.handlers.iterkeys(), cmp = natcmp):
-                self.queue.put(handler)
-
-                if self.asynchronous:
-                    handler_, memoize, timeout = self.handlers[handler]
-                    self.result.append((None, None, handler_))
-
-            if not self.asynchronous:
-                self.queue.join()
-
-        return tuple(self.result) or None
+        """ Executes all registered handlers, see dispatch """
+        return self.dispatch(self.asynchronous, *args, **kwargs)
+
+    def dispatch(self, asynchronous, *args, **kwargs):
+        """ Executes all registered handlers. Asynchronous handlers are
+        handed to the worker pool. Synchronous handlers run on the calling
+        thread, or, for parallel events, on the pool with the calling thread
+        helping out. Synchronous results are returned in priority order. """
+        return self._dispatch(asynchronous, False, args, kwargs)
+
+    def first(self, *args, **kwargs):
+        """ Executes the handlers synchronous, in priority order, until one
+        returns a result that isn't None. Handlers that haven't started by
+        then are skipped. Returns the results up to and including the first
+        result, so earlier errors are still reported. """
+        return self._dispatch(False, True, args, kwargs)
+
+    def submit(self, *args, **kwargs):
+        """ Starts all registered handlers and returns a Future per handler,
+        in priority order. The result of a Future is the execution result of
+        its handler. Handlers run on the worker pool, or on a thread of their
+        own when all workers are busy, so they start right away. """
+        futures = []
+        for handler in self.sorted_handlers():
+            future = Future(self._execute, handler, args, kwargs)
+            future.name = getattr(handler[0], '__name__', str(handler[0]))
+            if not self.pool.offer(future.run):
+                self.pool.thread(future.run)
+            futures.append(future)
+        return futures
+
+    def _dispatch(self, asynchronous, first, args, kwargs):
+        handlers = self.sorted_handlers()
+        if not handlers:
+            return None
+
+        if asynchronous:
+            for handler in handlers:
+                self.async_pool.put(self._execute_async, handler, args, kwargs)
+            return tuple([(None, None, handler[0]) for handler in handlers])
+
+        if not self.parallel or len(handlers) == 1:
+            result = []
+            for handler in handlers:
+                r = self._execute(handler, args, kwargs)
+                result.append(r)
+                if first and r[0] is True and r[1] is not None:
+                    break
+            return tuple(result)
+
+        batch = _Batch(self, handlers, args, kwargs, first = first)
+        for i in range(self._threads() - 1):
+            self.pool.put(batch.work)
+
+        batch.work()
+        return tuple(batch.wait())
 
     def count(self):
         """ Returns the count of registered handlers """
@@ -165,41 +234,42 @@ class Event(object):
 
     def clear(self):
         """ Discards all registered handlers and cached results """
-        self.handlers.clear()
+        self._handlers_lock.acquire()
+        try:
+            self.handlers = {}
+        finally:
+            self._handlers_lock.release()
         self.memoize.clear()
 
-    def _execute(self, *args, **kwargs):
-        """ Executes all handlers stored in the queue """
-        while True:
-            try:
-                handler, memoize, timeout = self.handlers[self.queue.get()]
-
-                if isinstance(self.lock, threading._RLock):
-                    self.lock.acquire() #synchronization
+    def sorted_handlers(self):
+        """ Returns the (handler, memoize, timeout) tuples sorted on
+        priority, cached until the registered handlers change """
+        handlers = self.handlers
+        cached = self._sorted
+        if cached is None or cached[0] is not handlers:
+            cached = self._sorted = (handlers, [handlers[key] for key in sorted(handlers.iterkeys(), cmp = natcmp)])
+        return cached[1]
 
-                try:
-                    r = self._memoize(memoize, timeout, handler, *args, **kwargs)
-                    if not self.asynchronous:
-                        self.result.append(tuple(r))
+    def _execute(self, handler, args, kwargs):
+        """ Executes a single handler, returns the execution result """
+        handler, memoize, timeout = handler
 
-                except Exception:
-                    if not self.asynchronous:
-                        self.result.append((False, self._error(sys.exc_info()),
-                                            handler))
-                    else:
-                        self.error_handler(sys.exc_info())
-                finally:
-                    if isinstance(self.lock, threading._RLock):
-                        self.lock.release()
+        if isinstance(self.lock, threading._RLock):
+            self.lock.acquire() #synchronization
 
-                    if not self.asynchronous:
-                        self.queue.task_done()
-
-                    if self.queue.empty():
-                        raise Queue.Empty
+        try:
+            return tuple(self._memoize(memoize, timeout, handler, *args, **kwargs))
+        except Exception:
+            return (False, self._error(sys.exc_info()), handler)
+        finally:
+            if isinstance(self.lock, threading._RLock):
+                self.lock.release()
 
-            except Queue.Empty:
-                break
+    def _execute_async(self, handler, args, kwargs):
+        """ Executes a single handler, errors go to the error_handler """
+        result = self._execute(handler, args, kwargs)
+        if result[0] is False and self.error_handler:
+            self.error_handler(result[1])
 
     def _extract(self, queue_item):
         """ Extracts a handler and handler's arguments that can be provided 
@@ -278,20 +348,21 @@ class Event(object):
 
 
     def _timeout(self, timeout, handler, *args, **kwargs):
-        """ Controls the time allocated for the execution of a method """
-        t = spawn_thread(target = handler, args = args, kwargs = kwargs)
-        t.daemon = True
-        t.start()
-        t.join(timeout)
-
-        if not t.is_alive():
-            if t.exc_info:
-                return t.exc_info
-            return t.result
+        """ Controls the time allocated for the execution of a method. The
+        method runs on a thread of its own, so the time isn't spent waiting
+        for a busy pool. When it doesn't finish in time it is left running
+        but its result is ignored. """
+        future = Future(handler, *args, **kwargs)
+        self.pool.thread(future.run)
+
+        if future.wait(timeout):
+            if future.exc_info:
+                return future.exc_info
+            return future.result()
         else:
             try:
                 msg = '[%s] Execution was forcefully terminated'
-                raise RuntimeError(msg % t.name)
+                raise RuntimeError(msg % getattr(handler, '__name__', handler))
             except:
                 return sys.exc_info()
 
@@ -314,21 +385,211 @@ class Event(object):
     __call__ = fire
     __len__ = count
 
-class spawn_thread(threading.Thread):
-    """ Spawns a new thread and returns the execution result """
+class WorkerPool(object):
+    """ Long-lived pool of daemon threads. Workers are started on demand,
+    up to the given amount of threads, and wait for new jobs afterwards.
+    A single pool can be shared by any number of events. The functions in
+    cleanup are called by the worker after each job. """
+
+    def __init__(self, threads = 10):
+        self.threads = threads
+        self.cleanup = []
+        self.queue = Queue.Queue()
+        self.workers = []
+        self.idle = 0
+        self.lock = threading.Lock()
+
+    def put(self, target, *args, **kwargs):
+        """ Queues target(*args, **kwargs) for execution """
+        self._reserve(True)
+        self.queue.put((target, args, kwargs))
+
+    def offer(self, target, *args, **kwargs):
+        """ Queues target(*args, **kwargs) only when a worker can start on
+        it right away, returns False when all workers are busy """
+        if not self._reserve(False):
+            return False
+
+        self.queue.put((target, args, kwargs))
+        return True
+
+    def _reserve(self, queue):
+        """ Claims an idle worker, starts one when there's room. Returns
+        False when all workers are busy, unless the job may be queued """
+        self.lock.acquire()
+        try:
+            if self.idle <= 0 and len(self.workers) < self.threads:
+                t = threading.Thread(target = self._work, name = 'WorkerPool-%d' % len(self.workers))
+                t.daemon = True
+                self.workers.append(t)
+                self.idle += 1
+                t.start()
+
+            if self.idle <= 0 and not queue:
+                return False
+
+            self.idle -= 1
+            return True
+        finally:
+            self.lock.release()
+
+    def thread(self, target, *args, **kwargs):
+        """ Executes target(*args, **kwargs) on a new daemon thread outside
+        the pool, for work that can't wait for a worker. The cleanup
+        functions are called afterwards, like for a job of the pool """
+        def run():
+            self._run(target, args, kwargs)
+
+        t = threading.Thread(target = run, name = 'WorkerPool-thread')
+        t.daemon = True
+        t.start()
+        return t
+
+    def _work(self):
+        while True:
+            target, args, kwargs = self.queue.get()
+            self._run(target, args, kwargs)
+
+            self.lock.acquire()
+            self.idle += 1
+            self.lock.release()
+
+    def _run(self, target, args, kwargs):
+        try:
+            target(*args, **kwargs)
+        except:
+            pass
+
+        for cleanup in self.cleanup:
+            try:
+                cleanup()
+            except:
+                pass
+
+class _Batch(object):
+    """ The handlers of a single synchronous fire. Handlers are taken from
+    the batch by pool workers and the firing thread, so a fire never waits
+    on a busy pool. With first set, the batch is done as soon as the highest
+    priority result that isn't None is known. """
+
+    def __init__(self, event, handlers, args, kwargs, first = False):
+        self.event = event
+        self.args = args
+        self.kwargs = kwargs
+        self.first = first
+        self.pending = deque(enumerate(handlers))
+        self.results = [None] * len(handlers)
+        self.remaining = len(handlers)
+        self.checked = 0
+        self.decided = False
+        self.done = threading.Condition(threading.Lock())
+
+    def work(self):
+        """ Executes handlers until none are left """
+        while not self.decided:
+            try:
+                i, handler = self.pending.popleft()
+            except IndexError:
+                return
+
+            result = self.event._execute(handler, self.args, self.kwargs)
+
+            self.done.acquire()
+            try:
+                self.results[i] = result
+                self.remaining -= 1
+                if self.first:
+                    self._decide()
+                if self.remaining == 0 or self.decided:
+                    self.done.notifyAll()
+            finally:
+                self.done.release()
+
+    def _decide(self):
+        """ Walks the finished results in priority order, stops the batch
+        at the first usable one """
+        while self.checked < len(self.results) and self.results[self.checked] is not None:
+            r = self.results[self.checked]
+            self.checked += 1
+            if r[0] is True and r[1] is not None:
+                self.decided = True
+                self.pending.clear()
+                return
+
+    def wait(self):
+        """ Waits for the handlers to finish, returns their results """
+        self.done.acquire()
+        try:
+            while self.remaining and not self.decided:
+                self.done.wait()
+        finally:
+            self.done.release()
+
+        if self.decided:
+            return self.results[:self.checked]
+        return self.results
 
-    def __init__(self, target, args = (), kwargs = {}, default = None):
-        threading.Thread.__init__(self)
+class Future(object):
+    """ Result of a target that is executed on a worker pool """
+
+    def __init__(self, target, *args, **kwargs):
+        self.name = getattr(target, '__name__', str(target))
         self._target = target
         self._args = args
         self._kwargs = kwargs
-        self.result = default
+        self._result = None
+        self._started = False
+        self._cancelled = False
+        self._done = threading.Event()
+        self._lock = threading.Lock()
         self.exc_info = None
 
     def run(self):
+        """ Executes the target, unless it already started somewhere
+        else or was cancelled. Returns True if it was executed here """
+        self._lock.acquire()
+        try:
+            if self._started or self._cancelled:
+                return False
+            self._started = True
+        finally:
+            self._lock.release()
+
         try:
-            self.result = self._target(*self._args, **self._kwargs)
+            self._result = self._target(*self._args, **self._kwargs)
         except:
             self.exc_info = sys.exc_info()
         finally:
             del self._target, self._args, self._kwargs
+            self._done.set()
+
+        return True
+
+    def cancel(self):
+        """ Prevents the target from running, returns False if it
+        already started """
+        self._lock.acquire()
+        try:
+            if not self._started and not self._cancelled:
+                self._cancelled = True
+                self._done.set()
+            return self._cancelled
+        finally:
+            self._lock.release()
+
+    def cancelled(self):
+        return self._cancelled
+
+    def done(self):
+        return self._done.isSet()
+
+    def wait(self, timeout = None):
+        """ Waits for the target to finish, returns True if it did """
+        self._done.wait(timeout)
+        return self._done.isSet()
+
+    def result(self, timeout = None):
+        """ Returns the result of the target, None if it didn't finish in
+        time or raised an exception (see exc_info) """
+        if self.wait(timeout):
+            return self._result
@@ -202,4 +202,19 @@ def _parseBitRate(value):
 
     return bitrate * multi
 
-print json.dumps(parseMetadata(getMetadata(sys.argv[1])))
\ No newline at end of file
+def worker():
+    ''' Keep running, read a JSON encoded filename per line and answer with its metadata '''
+    for line in iter(sys.stdin.readline, ''):
+        try:
+            metadata = parseMetadata(getMetadata(json.loads(line).encode('latin-1')))
+        except:
+            metadata = None
+
+        sys.stdout.write(json.dumps(metadata) + '\n')
+        sys.stdout.flush()
+
+if __name__ == '__main__':
+    if sys.argv[1] == '--worker':
+        worker()
+    else:
+        print json.dumps(parseMetadata(getMetadata(sys.argv[1])))
\ No newline at end of file
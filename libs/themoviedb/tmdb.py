@@ -42,33 +42,28 @@ def opensubtitleHashFile(name):
     > last 64k (even if they overlap because the file is smaller than 128k).
     A slightly more Pythonic version of the Python solution on..
     http://trac.opensubtitles.org/projects/opensubtitles/wiki/HashSourceCodes
+
+    Both blocks are read at once and unpacked in a single call.
     """
-    longlongformat = 'q'
-    bytesize = struct.calcsize(longlongformat)
+    blocksize = 65536
+    longlongformat = '<%dq' % (blocksize / struct.calcsize('<q'))
+
+    filesize = os.path.getsize(name)
+
+    if filesize < blocksize * 2:
+        raise ValueError("File size must be larger than %s bytes (is %s)" % (blocksize * 2, filesize))
 
     f = open(name, "rb")
+    try:
+        head = f.read(blocksize)
+        f.seek(filesize - blocksize, 0)
+        tail = f.read(blocksize)
+    finally:
+        f.close()
 
-    filesize = os.path.getsize(name)
-    fhash = filesize
-
-    if filesize < 65536 * 2:
-        raise ValueError("File size must be larger than %s bytes (is %s)" % (65536 * 2, filesize))
-
-    for x in range(65536 / bytesize):
-        buf = f.read(bytesize)
-        (l_value,) = struct.unpack(longlongformat, buf)
-        fhash += l_value
-        fhash = fhash & 0xFFFFFFFFFFFFFFFF # to remain as 64bit number
-
-    f.seek(max(0, filesize - 65536), 0)
-    for x in range(65536 / bytesize):
-        buf = f.read(bytesize)
-        (l_value,) = struct.unpack(longlongformat, buf)
-        fhash += l_value
-        fhash = fhash & 0xFFFFFFFFFFFFFFFF
-
-    f.close()
-    return  "%016x" % fhash
+    fhash = filesize + sum(struct.unpack(longlongformat, head)) + sum(struct.unpack(longlongformat, tail))
+
+    return "%016x" % (fhash & 0xFFFFFFFFFFFFFFFF) # to remain as 64bit number
 
 class XmlHandler:
     """Deals with retrieval of XML files from API"""
@@ -0,0 +1,8 @@
+from os.path import dirname
+import os
+import sys
+
+# Same paths as CouchPotato.py
+base_path = dirname(dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(base_path, 'libs'))
+sys.path.insert(0, base_path)
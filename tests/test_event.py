@@ -0,0 +1,42 @@
+from couchpotato.core.event import Event
+import sys
+import threading
+import unittest
+
+
+class EventHandlersTest(unittest.TestCase):
+
+    def toggleConcurrently(self):
+        e = Event()
+        keep = [lambda i = i: i for i in range(200)]
+        remove = [lambda i = i: i for i in range(200)]
+        for handler in remove:
+            e.handle(handler)
+
+        def toggle(offset):
+            for i in range(offset, len(keep), 8):
+                e.handle(keep[i])
+                e.unhandle(remove[i])
+
+        threads = [threading.Thread(target = toggle, args = (offset,)) for offset in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(sorted([h[0] for h in e.sorted_handlers()]), sorted(keep))
+
+    def testConcurrentRegistration(self):
+        ''' Plugins that get toggled at the same time don't lose each other's handlers '''
+
+        # Switch threads as often as possible, to hit the race
+        interval = sys.getcheckinterval()
+        sys.setcheckinterval(1)
+        try:
+            for i in range(20):
+                self.toggleConcurrently()
+        finally:
+            sys.setcheckinterval(interval)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+from couchpotato.core.plugins.movie.main import MoviePlugin
+from couchpotato.core.settings.model import Movie, Library, LibraryTitle, \
+    Status, Profile, ProfileType, Quality, Release, File, FileType, eagerLoad
+from elixir import metadata, setup_all
+from sqlalchemy.engine import create_engine
+from sqlalchemy.orm.exc import DetachedInstanceError
+from sqlalchemy.orm.session import sessionmaker
+import unittest
+
+engine = create_engine('sqlite://')
+metadata.bind = engine
+setup_all(True)
+
+
+class MovieListTest(unittest.TestCase):
+    ''' movie.list streams the movies after the request removed its session,
+    so everything to_dict touches has to be loaded by eagerLoad up front '''
+
+    def setUp(self):
+        self.db = sessionmaker(bind = engine)()
+
+        status = Status(identifier = 'active', label = u'Active')
+        quality = Quality(identifier = '720p', label = u'720P', order = 1)
+        file_type = FileType(identifier = 'movie', type = u'video', name = u'Movie')
+
+        movie = Movie(status = status)
+        movie.profile = Profile(label = u'Best', order = 1)
+        movie.profile.types.append(ProfileType(quality = quality, order = 1))
+        movie.library = Library(identifier = 'tt0111161', year = 1994)
+        movie.library.titles.append(LibraryTitle(title = u'The Shawshank Redemption', default = True))
+        movie.library.files.append(File(path = u'/movies/poster.jpg', type = file_type))
+        movie.files.append(File(path = u'/movies/trailer.mov', type = file_type))
+
+        release = Release(identifier = 'abc', status = status, quality = quality)
+        release.files.append(File(path = u'/movies/movie.mkv', type = file_type))
+        movie.releases.append(release)
+
+        self.db.add(movie)
+        self.db.commit()
+        self.db.close()
+
+    def tearDown(self):
+        self.db.close()
+        metadata.drop_all()
+        metadata.create_all()
+
+    def getMovie(self, movie_dict):
+        movie = self.db.query(Movie).options(*eagerLoad(Movie, movie_dict)).one()
+
+        # What teardown_request does before the response is streamed
+        self.db.close()
+
+        return movie
+
+    def testDefaultDictIsEagerLoaded(self):
+        movie = self.getMovie(MoviePlugin.default_dict).to_dict(MoviePlugin.default_dict)
+
+        self.assertEqual(movie['library']['titles'][0]['title'], u'The Shawshank Redemption')
+        self.assertEqual(movie['profile']['types'][0]['quality']['identifier'], '720p')
+        self.assertEqual(movie['releases'][0]['files'][0]['path'], u'/movies/movie.mkv')
+        self.assertEqual(movie['status']['identifier'], 'active')
+
+    def testFieldsAreEagerLoaded(self):
+        for field in MoviePlugin.default_dict:
+            movie_dict = {field: MoviePlugin.default_dict[field]}
+            self.getMovie(movie_dict).to_dict(movie_dict)
+
+    def testMissingRelationFails(self):
+        movie = self.getMovie({'library': {}})
+        self.assertRaises(DetachedInstanceError, movie.to_dict, {'library': {'titles': {}}})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+from couchpotato.core.plugins.scanner.probe import probe
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+
+def ebml(element_id, data):
+    ''' Element with a 4 byte id and an 8 byte size '''
+    return element_id + '\x01' + struct.pack('>Q', len(data))[1:] + data
+
+class ProbeTest(unittest.TestCase):
+    ''' Headers without the streams fall back to the full parse, instead of failing '''
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def createFile(self, name, data):
+        path = os.path.join(self.folder, name)
+        f = open(path, 'wb')
+        f.write(data)
+        f.close()
+        return path
+
+    def testMp4WithoutMoov(self):
+        data = struct.pack('>I4s', 16, 'ftyp') + 'isom\x00\x00\x02\x00'
+        data += struct.pack('>I4s', 16, 'mdat') + '\x00' * 8
+        self.assertEqual(probe(self.createFile('movie.mp4', data)), None)
+
+    def testAviStartingWithJunk(self):
+        junk = struct.pack('<4sI', 'JUNK', 8) + '\x00' * 8
+        data = 'RIFF' + struct.pack('<I', 4 + len(junk)) + 'AVI ' + junk
+        self.assertEqual(probe(self.createFile('movie.avi', data)), None)
+
+    def testMatroskaTracksAfterCluster(self):
+        header = ebml('\x1a\x45\xdf\xa3', ebml('\x42\x82', 'matroska'))
+        segment = ebml('\x15\x49\xa9\x66', '') + ebml('\x1f\x43\xb6\x75', '\x00' * 16) + ebml('\x16\x54\xae\x6b', '')
+        data = header + ebml('\x18\x53\x80\x67', segment)
+        self.assertEqual(probe(self.createFile('movie.mkv', data)), None)
+
+    def testUnknownFile(self):
+        self.assertEqual(probe(self.createFile('movie.mpg', '\x00' * 64)), None)
+
+if __name__ == '__main__':
+    unittest.main()